@@ -1,11 +1,17 @@
 import os
+import time
+import calendar
+import asyncio
+import hashlib
 import jwt
+import bcrypt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Union
-from passlib.context import CryptContext
+from typing import Optional, Union, Callable
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from .cache import TTLCache, LRUCache
 from .database import get_db
 from .models import User
 from .schemas import UserCreate, UserResponse, TokenData
@@ -14,47 +20,134 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+TOKEN_CACHE_MAXSIZE = int(os.getenv("TOKEN_CACHE_MAXSIZE", "10000"))
+SIGNED_TOKEN_CACHE_MAXSIZE = int(os.getenv("SIGNED_TOKEN_CACHE_MAXSIZE", "128"))
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+PASSWORD_CACHE_TTL_SECONDS = int(os.getenv("PASSWORD_CACHE_TTL_SECONDS", "300"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt only uses the first 72 bytes of a password; passlib truncated silently too.
+BCRYPT_MAX_PASSWORD_BYTES = 72
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 4)))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_password_slots = asyncio.Semaphore(PASSWORD_HASH_MAX_PENDING)
+
+async def run_password_task(func: Callable, *args):
+    """Run a bcrypt-bound call on the password pool, shedding load once the pool is saturated."""
+    if _password_slots.locked():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent authentication requests",
+            headers={"Retry-After": "1"},
+        )
+    async with _password_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+
 class AuthManager:
     def __init__(self):
         self.secret_key = SECRET_KEY
         self.algorithm = ALGORITHM
+        # Reuse one decoder and the key bytes instead of re-deriving them per request.
+        self._jwt = jwt.PyJWT()
+        self._key = SECRET_KEY.encode("utf-8")
+        self._algorithms = [ALGORITHM]
         self.access_token_expire_minutes = ACCESS_TOKEN_EXPIRE_MINUTES
         self.refresh_token_expire_days = REFRESH_TOKEN_EXPIRE_DAYS
+        self.bcrypt_rounds = BCRYPT_ROUNDS
+        self.user_cache_ttl_seconds = USER_CACHE_TTL_SECONDS
+        self._token_cache = TTLCache(maxsize=TOKEN_CACHE_MAXSIZE)
+        self._user_cache = TTLCache(maxsize=TOKEN_CACHE_MAXSIZE)
+        # Successful bcrypt checks only, keyed by a per-process keyed digest of (password, hash).
+        self._password_cache = TTLCache(maxsize=TOKEN_CACHE_MAXSIZE)
+        self._password_cache_key = os.urandom(32)
+        self._signed_tokens = LRUCache(maxsize=SIGNED_TOKEN_CACHE_MAXSIZE)
 
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+        password_bytes = plain_password.encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES]
+        hash_bytes = hashed_password.encode("utf-8")
+        cache_key = hashlib.blake2b(
+            password_bytes + b"\0" + hash_bytes, key=self._password_cache_key, digest_size=32
+        ).digest()
+        if self._password_cache.get(cache_key):
+            return True
+        # Hashes written by passlib use the same $2a$/$2b$/$2y$ modular format.
+        try:
+            verified = bcrypt.checkpw(password_bytes, hash_bytes)
+        except ValueError:
+            return False
+        if verified:
+            self._password_cache.set(cache_key, True, time.time() + PASSWORD_CACHE_TTL_SECONDS)
+        return verified
 
     def get_password_hash(self, password: str) -> str:
-        return pwd_context.hash(password)
+        hashed = bcrypt.hashpw(
+            password.encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES],
+            bcrypt.gensalt(rounds=self.bcrypt_rounds)
+        )
+        return hashed.decode("utf-8")
 
-    def create_access_token(self, data: dict) -> str:
+    def _sign(self, data: dict, token_type: str, expire: datetime) -> str:
+        # exp is encoded in whole seconds, so identical claims within one second sign identically.
+        exp = calendar.timegm(expire.utctimetuple())
         to_encode = data.copy()
-        expire = datetime.utcnow() + timedelta(minutes=self.access_token_expire_minutes)
-        to_encode.update({"exp": expire, "token_type": "access"})
-        encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
+        to_encode.update({"exp": exp, "token_type": token_type})
+        try:
+            cache_key = (tuple(sorted(data.items())), token_type, exp)
+            hash(cache_key)
+        except TypeError:
+            return self._jwt.encode(to_encode, self._key, algorithm=self.algorithm)
+        encoded_jwt = self._signed_tokens.get(cache_key)
+        if encoded_jwt is None:
+            encoded_jwt = self._jwt.encode(to_encode, self._key, algorithm=self.algorithm)
+            self._signed_tokens.set(cache_key, encoded_jwt)
         return encoded_jwt
 
-    def create_refresh_token(self, data: dict) -> str:
-        to_encode = data.copy()
-        expire = datetime.utcnow() + timedelta(days=self.refresh_token_expire_days)
-        to_encode.update({"exp": expire, "token_type": "refresh"})
-        encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
-        return encoded_jwt
+    def create_access_token(self, data: dict, now: Optional[datetime] = None) -> str:
+        expire = (now or datetime.utcnow()) + timedelta(minutes=self.access_token_expire_minutes)
+        return self._sign(data, "access", expire)
+
+    def create_refresh_token(self, data: dict, now: Optional[datetime] = None) -> str:
+        expire = (now or datetime.utcnow()) + timedelta(days=self.refresh_token_expire_days)
+        return self._sign(data, "refresh", expire)
 
     def verify_token(self, token: str) -> Optional[TokenData]:
+        # Keyed by a digest so raw bearer tokens are never kept in memory.
+        cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        cached = self._token_cache.get(cache_key)
+        if cached is not None:
+            return cached
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            payload = self._jwt.decode(token, self._key, algorithms=self._algorithms)
             username: str = payload.get("sub")
             token_type: str = payload.get("token_type")
             if username is None:
                 return None
-            return TokenData(username=username, token_type=token_type)
+            token_data = TokenData(username=username, token_type=token_type)
         except jwt.PyJWTError:
             return None
+        exp = payload.get("exp")
+        if exp is not None:
+            self._token_cache.set(cache_key, token_data, float(exp))
+        return token_data
+
+    def get_cached_user(self, username: str) -> Optional[User]:
+        return self._user_cache.get(username)
+
+    def cache_user(self, user: User):
+        self._user_cache.set(user.username, user, time.time() + self.user_cache_ttl_seconds)
+
+    def invalidate_user(self, username: str):
+        self._user_cache.pop(username)
+
+    def clear_caches(self):
+        self._token_cache.clear()
+        self._user_cache.clear()
+        self._password_cache.clear()
+        self._signed_tokens.clear()
 
     def authenticate_user(self, db: Session, username: str, password: str) -> Optional[User]:
         user = db.query(User).filter(User.username == username).first()
@@ -64,8 +157,9 @@ class AuthManager:
             return None
         return user
 
-    def create_user(self, db: Session, user_data: UserCreate) -> User:
-        hashed_password = self.get_password_hash(user_data.password)
+    def create_user(self, db: Session, user_data: UserCreate, hashed_password: Optional[str] = None) -> User:
+        if hashed_password is None:
+            hashed_password = self.get_password_hash(user_data.password)
         db_user = User(
             username=user_data.username,
             email=user_data.email,
@@ -74,7 +168,6 @@ class AuthManager:
         )
         db.add(db_user)
         db.commit()
-        db.refresh(db_user)
         return db_user
 
 auth_manager = AuthManager()
@@ -93,13 +186,18 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.username == token_data.username).first()
+    user = auth_manager.get_cached_user(token_data.username)
     if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        user = db.query(User).filter(User.username == token_data.username).first()
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        # Detach so later commits in this session cannot expire the shared copy.
+        db.expunge(user)
+        auth_manager.cache_user(user)
     
     if not user.is_active:
         raise HTTPException(
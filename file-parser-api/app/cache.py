@@ -0,0 +1,70 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+class TTLCache:
+    """Small in-process cache whose entries each carry their own expiry timestamp."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: Dict[Any, Tuple[float, Any]] = {}
+
+    def get(self, key: Any) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            self._entries.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: Any, value: Any, expires_at: float):
+        if self.maxsize <= 0 or expires_at <= time.time():
+            return
+        if key not in self._entries and len(self._entries) >= self.maxsize:
+            self._evict()
+        self._entries[key] = (expires_at, value)
+
+    def pop(self, key: Any):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self):
+        now = time.time()
+        for key in [k for k, (expires_at, _) in list(self._entries.items()) if expires_at <= now]:
+            self._entries.pop(key, None)
+        while len(self._entries) >= self.maxsize:
+            self._entries.pop(next(iter(self._entries)), None)
+
+class LRUCache:
+    """Small in-process cache that drops the least recently used entry once full."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Any, Any]" = OrderedDict()
+
+    def get(self, key: Any) -> Optional[Any]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Any, value: Any):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
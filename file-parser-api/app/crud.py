@@ -1,22 +1,40 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_, or_
+from sqlalchemy import desc, and_, or_, func, text, column, literal_column, cast, true, Text
+from sqlalchemy.engine import Row
 from . import models
-from .schemas import UserCreate, UserUpdate
-from typing import Optional, List, Dict, Any
+from .cache import TTLCache
+from .auth import auth_manager
+from .schemas import UserUpdate
+from typing import Optional, List, Dict, Any, Tuple
+import os
 import json
-
-def create_user(db: Session, user_data: UserCreate) -> models.User:
-    hashed_password = models.User.get_password_hash(user_data.password)
-    db_user = models.User(
-        username=user_data.username,
-        email=user_data.email,
-        full_name=user_data.full_name,
-        hashed_password=hashed_password
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+import time
+
+# Progress ticks for the same file are written at most this often unless they move far enough.
+PROGRESS_WRITE_INTERVAL_SECONDS = 0.5
+PROGRESS_WRITE_MIN_STEP = 5
+_progress_writes: Dict[str, Tuple[int, float]] = {}
+
+# Parsed content does not change once a file is ready, so keep recently used payloads decoded.
+FILE_CONTENT_CACHE_MAXSIZE = int(os.getenv("FILE_CONTENT_CACHE_MAXSIZE", "256"))
+FILE_CONTENT_CACHE_TTL_SECONDS = int(os.getenv("FILE_CONTENT_CACHE_TTL_SECONDS", "300"))
+_content_cache = TTLCache(maxsize=FILE_CONTENT_CACHE_MAXSIZE)
+
+FILE_LIST_COLUMNS = (
+    models.File.id,
+    models.File.filename,
+    models.File.original_filename,
+    models.File.file_type,
+    models.File.file_size,
+    models.File.status,
+    models.File.progress,
+    models.File.error_message,
+    models.File.file_metadata,
+    models.File.processing_time,
+    models.File.created_at,
+    models.File.updated_at,
+    models.File.processed_at,
+)
 
 def get_user(db: Session, user_id: int) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.id == user_id).first()
@@ -30,9 +48,12 @@ def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
 def update_user(db: Session, user_id: int, user_data: UserUpdate) -> Optional[models.User]:
     db_user = get_user(db, user_id)
     if db_user:
+        username = db_user.username
         for field, value in user_data.dict(exclude_unset=True).items():
             setattr(db_user, field, value)
         db.commit()
+        # Drop the cached copy so authentication sees deactivation or a rename right away.
+        auth_manager.invalidate_user(username)
         db.refresh(db_user)
     return db_user
 
@@ -41,6 +62,7 @@ def delete_user(db: Session, user_id: int) -> bool:
     if db_user:
         db.delete(db_user)
         db.commit()
+        auth_manager.invalidate_user(db_user.username)
         return True
     return False
 
@@ -51,7 +73,6 @@ def create_file(db: Session, file_data: dict) -> models.File:
     db_file = models.File(**file_data)
     db.add(db_file)
     db.commit()
-    db.refresh(db_file)
     return db_file
 
 def get_file(db: Session, file_id: str) -> Optional[models.File]:
@@ -62,46 +83,80 @@ def get_file_by_owner(db: Session, file_id: str, owner_id: int) -> Optional[mode
         and_(models.File.id == file_id, models.File.owner_id == owner_id)
     ).first()
 
-def update_file_progress(db: Session, file_id: str, progress: int, status: str = None, processing_time: int = None) -> Optional[models.File]:
-    db_file = get_file(db, file_id)
-    if db_file:
-        db_file.progress = progress
-        if status:
-            db_file.status = status
-        if processing_time is not None:
-            db_file.processing_time = processing_time
-        db.commit()
-        db.refresh(db_file)
-    return db_file
-
-def update_file_content(db: Session, file_id: str, content: str, file_metadata: str = None, 
-                         status: str = "ready", processing_time: int = None) -> Optional[models.File]:
-    db_file = get_file(db, file_id)
-    if db_file:
-        db_file.content = content
-        db_file.status = status
-        db_file.progress = 100
-        if file_metadata:
-            db_file.file_metadata = file_metadata
-        if processing_time is not None:
-            db_file.processing_time = processing_time
-        db.commit()
-        db.refresh(db_file)
-    return db_file
-
-def update_file_error(db: Session, file_id: str, error_message: str) -> Optional[models.File]:
-    db_file = get_file(db, file_id)
-    if db_file:
-        db_file.status = "failed"
-        db_file.error_message = error_message
-        db.commit()
-        db.refresh(db_file)
-    return db_file
-
-def list_files_by_owner(db: Session, owner_id: int, limit: int = 100, offset: int = 0) -> List[models.File]:
-    return (
+def _update_file_fields(db: Session, file_id: str, values: Dict[str, Any]) -> bool:
+    updated = (
         db.query(models.File)
-        .filter(models.File.owner_id == owner_id)
+        .filter(models.File.id == file_id)
+        .update(values, synchronize_session=False)
+    )
+    db.commit()
+    return updated > 0
+
+def update_file_progress(db: Session, file_id: str, progress: int, status: str = None, processing_time: int = None) -> bool:
+    now = time.monotonic()
+    last_write = _progress_writes.get(file_id)
+    if status is None and last_write is not None:
+        last_progress, last_written_at = last_write
+        if (now - last_written_at < PROGRESS_WRITE_INTERVAL_SECONDS
+                and abs(progress - last_progress) < PROGRESS_WRITE_MIN_STEP):
+            return False
+    
+    values = {"progress": progress}
+    if status:
+        values["status"] = status
+    if processing_time is not None:
+        values["processing_time"] = processing_time
+    updated = _update_file_fields(db, file_id, values)
+    _progress_writes[file_id] = (progress, now)
+    return updated
+
+def update_file_content(db: Session, file_id: str, content: Any, file_metadata: Optional[Dict[str, Any]] = None, 
+                         status: str = "ready", processing_time: int = None) -> bool:
+    _progress_writes.pop(file_id, None)
+    values = {"status": status, "progress": 100}
+    if file_metadata:
+        values["file_metadata"] = file_metadata
+    if processing_time is not None:
+        values["processing_time"] = processing_time
+    if not _update_file_fields(db, file_id, values):
+        return False
+    
+    payload_updated = (
+        db.query(models.FilePayload)
+        .filter(models.FilePayload.file_id == file_id)
+        .update({"content": content}, synchronize_session=False)
+    )
+    if not payload_updated:
+        db.add(models.FilePayload(file_id=file_id, content=content))
+    db.commit()
+    _content_cache.set(file_id, content, time.time() + FILE_CONTENT_CACHE_TTL_SECONDS)
+    return True
+
+def get_file_content(db: Session, file_id: str) -> Optional[Any]:
+    content = _content_cache.get(file_id)
+    if content is None:
+        content = (
+            db.query(models.FilePayload.content)
+            .filter(models.FilePayload.file_id == file_id)
+            .scalar()
+        )
+        if content is not None:
+            _content_cache.set(file_id, content, time.time() + FILE_CONTENT_CACHE_TTL_SECONDS)
+    return content
+
+def update_file_error(db: Session, file_id: str, error_message: str) -> bool:
+    _progress_writes.pop(file_id, None)
+    return _update_file_fields(db, file_id, {"status": "failed", "error_message": error_message})
+
+def list_files_by_owner(db: Session, owner_id: int, limit: int = 100, offset: int = 0,
+                        file_type: Optional[str] = None, status: Optional[str] = None) -> List[Row]:
+    query = db.query(*FILE_LIST_COLUMNS).filter(models.File.owner_id == owner_id)
+    if file_type:
+        query = query.filter(models.File.file_type == file_type)
+    if status:
+        query = query.filter(models.File.status == status)
+    return (
+        query
         .order_by(desc(models.File.created_at))
         .offset(offset)
         .limit(limit)
@@ -111,44 +166,75 @@ def list_files_by_owner(db: Session, owner_id: int, limit: int = 100, offset: in
 def delete_file(db: Session, file_id: str) -> bool:
     db_file = get_file(db, file_id)
     if db_file:
+        _content_cache.pop(file_id)
+        db.query(models.FilePayload).filter(models.FilePayload.file_id == file_id).delete(synchronize_session=False)
         db.delete(db_file)
         db.commit()
         return True
     return False
 
-def search_files(db: Session, owner_id: int, query: str) -> List[models.File]:
-    return (
-        db.query(models.File)
-        .filter(
-            and_(
-                models.File.owner_id == owner_id,
-                or_(
-                    models.File.original_filename.contains(query),
-                    models.File.content.contains(query)
-                )
-            )
+def _fts_prefix_phrase(query: str) -> str:
+    # Quote the user input as a single FTS5 phrase so operators in it are not interpreted.
+    return '"' + query.replace('"', '""') + '"*'
+
+def search_files(db: Session, owner_id: int, query: str) -> List[Row]:
+    dialect = db.get_bind().dialect.name
+    if not query.strip():
+        # The FTS match would find nothing; an empty search lists every file, as the LIKE filter did.
+        search_filter = true()
+    elif dialect == "sqlite":
+        matches = text(
+            "SELECT rowid FROM files_fts WHERE files_fts MATCH :match"
+        ).bindparams(match=_fts_prefix_phrase(query)).columns(column("rowid"))
+        search_filter = literal_column("files.rowid").in_(matches)
+    elif dialect == "postgresql":
+        content_matches = text(
+            f"SELECT file_id FROM file_payloads WHERE {models.POSTGRES_CONTENT_DOCUMENT} @@ plainto_tsquery('simple', :content_query)"
+        ).bindparams(content_query=query).columns(column("file_id"))
+        search_filter = or_(
+            text(f"{models.POSTGRES_FILENAME_DOCUMENT} @@ plainto_tsquery('simple', :filename_query)").bindparams(filename_query=query),
+            models.File.id.in_(content_matches)
+        )
+    else:
+        content_matches = (
+            db.query(models.FilePayload.file_id)
+            .filter(cast(models.FilePayload.content, Text).contains(query))
         )
+        search_filter = or_(
+            models.File.original_filename.contains(query),
+            models.File.id.in_(content_matches)
+        )
+    return (
+        db.query(*FILE_LIST_COLUMNS)
+        .filter(and_(models.File.owner_id == owner_id, search_filter))
         .order_by(desc(models.File.created_at))
         .all()
     )
 
 def get_file_statistics(db: Session, owner_id: int) -> Dict[str, Any]:
-    files = db.query(models.File).filter(models.File.owner_id == owner_id).all()
-    
-    total_files = len(files)
-    file_types = {}
-    status_counts = {}
-    total_size = 0
-    total_processing_time = 0
+    type_rows = (
+        db.query(
+            models.File.file_type,
+            func.count(models.File.id),
+            func.coalesce(func.sum(models.File.file_size), 0),
+            func.coalesce(func.sum(models.File.processing_time), 0)
+        )
+        .filter(models.File.owner_id == owner_id)
+        .group_by(models.File.file_type)
+        .all()
+    )
+    status_rows = (
+        db.query(models.File.status, func.count(models.File.id))
+        .filter(models.File.owner_id == owner_id)
+        .group_by(models.File.status)
+        .all()
+    )
     
-    for file in files:
-        file_types[file.file_type] = file_types.get(file.file_type, 0) + 1
-        status_counts[file.status] = status_counts.get(file.status, 0) + 1
-        
-        if file.file_size:
-            total_size += file.file_size
-        if file.processing_time:
-            total_processing_time += file.processing_time
+    file_types = {file_type: count for file_type, count, _, _ in type_rows}
+    status_counts = {status: count for status, count in status_rows}
+    total_files = sum(file_types.values())
+    total_size = sum(size for _, _, size, _ in type_rows)
+    total_processing_time = sum(processing_time for _, _, _, processing_time in type_rows)
     
     return {
         "total_files": total_files,
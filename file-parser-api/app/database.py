@@ -1,18 +1,65 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import re
+import json
+import orjson
 
 os.makedirs("data", exist_ok=True)
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./data/files.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/files.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+
+def _json_serializer(value) -> str:
+    try:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+    except orjson.JSONEncodeError:
+        # Integers wider than 64 bits are out of orjson's range.
+        return json.dumps(value, default=str)
+
+# orjson decodes integers beyond 64 bits as floats, silently losing precision. Any run of 19+
+# digits might be one, so such documents go to the stdlib parser, which keeps them exact.
+_LONG_DIGIT_RUN = re.compile(r"\d{19}")
+_LONG_DIGIT_RUN_BYTES = re.compile(rb"\d{19}")
+
+def json_loads(data):
+    """Parse JSON text or bytes with orjson, falling back to the stdlib where orjson is lossy or strict."""
+    long_digits = _LONG_DIGIT_RUN if isinstance(data, str) else _LONG_DIGIT_RUN_BYTES
+    if long_digits.search(data) is not None:
+        return json.loads(data if isinstance(data, (str, bytes)) else bytes(data))
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        # orjson rejects NaN/Infinity literals, which the stdlib accepts.
+        return json.loads(data if isinstance(data, (str, bytes)) else bytes(data))
+
+def _json_deserializer(value):
+    return json_loads(value)
+
+connect_args = {"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}
+    connect_args=connect_args,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    json_serializer=_json_serializer,
+    json_deserializer=_json_deserializer
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+        # SQLite ignores ON DELETE CASCADE (file_payloads -> files) unless this is set per connection.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+# Committed objects keep their loaded state; server defaults come back via RETURNING (eager_defaults).
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
@@ -1,11 +1,13 @@
 from fastapi import FastAPI, UploadFile, File, Depends, BackgroundTasks, HTTPException, Query, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 import uuid
-import shutil
 import os
 import json
+import math
+import orjson
 import logging
 from typing import List, Optional
 from datetime import datetime
@@ -17,32 +19,65 @@ from .schemas import (
     Token, LoginRequest, RefreshTokenRequest, APIResponse, ErrorResponse
 )
 from .websocket import manager
+from .database import get_db
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _finite(value):
+    # orjson writes NaN/Infinity as null; mirror that so the fallback still emits valid JSON.
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+class FallbackORJSONResponse(ORJSONResponse):
+    """ORJSONResponse that falls back to the stdlib for content orjson cannot encode (integers beyond 64 bits)."""
+
+    def render(self, content) -> bytes:
+        try:
+            return super().render(content)
+        except orjson.JSONEncodeError:
+            return json.dumps(
+                _finite(content), ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=str
+            ).encode("utf-8")
+
 app = FastAPI(
     title="File Parser CRUD API with Authentication",
     description="A production-ready FastAPI application for parsing and managing files with JWT authentication, real-time updates, and multiple file format support",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FallbackORJSONResponse
 )
 
+# Upper bound for the content endpoint's long-poll.
+MAX_WAIT_READY_SECONDS = 30
+
+ALLOWED_ORIGINS = [origin.strip() for origin in os.getenv("ALLOWED_ORIGINS", "*").split(",") if origin.strip()]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
+    allow_origins=ALLOWED_ORIGINS,
+    # Browsers reject credentialed requests against a wildcard origin; auth uses bearer headers anyway.
+    allow_credentials="*" not in ALLOWED_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=86400,
 )
 
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@app.on_event("startup")
+def prepare_database():
+    with database.engine.begin() as connection:
+        models.prepare_database(connection)
+
+def file_list_response(rows) -> FileList:
+    # Rows come straight from our own projected query, so skip per-row validation.
+    file_list = [FileBase.model_construct(**row._mapping) for row in rows]
+    return FileList.model_construct(files=file_list, total=len(file_list))
 
 @app.get("/", response_model=APIResponse)
 async def root():
@@ -65,18 +100,21 @@ async def root():
 @app.post("/auth/register", response_model=UserResponse)
 async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     try:
-        existing_user = crud.get_user_by_username(db, user.username)
+        # Still async for the bounded password pool, so the lookups go to the threadpool themselves.
+        existing_user = await run_in_threadpool(crud.get_user_by_username, db, user.username)
         if existing_user:
             raise HTTPException(status_code=400, detail="Username already registered")
         
         if user.email:
-            existing_email = crud.get_user_by_email(db, user.email)
+            existing_email = await run_in_threadpool(crud.get_user_by_email, db, user.email)
             if existing_email:
                 raise HTTPException(status_code=400, detail="Email already registered")
         
-        db_user = auth.auth_manager.create_user(db, user)
+        db_user = await auth.run_password_task(auth.auth_manager.create_user, db, user)
         logger.info(f"New user registered: {db_user.username}")
         return db_user
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"User registration failed: {e}")
         raise HTTPException(status_code=500, detail="Registration failed")
@@ -84,7 +122,9 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
 @app.post("/auth/login", response_model=Token)
 async def login_user(login_data: LoginRequest, db: Session = Depends(get_db)):
     try:
-        user = auth.auth_manager.authenticate_user(db, login_data.username, login_data.password)
+        user = await auth.run_password_task(
+            auth.auth_manager.authenticate_user, db, login_data.username, login_data.password
+        )
         if not user:
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
@@ -93,12 +133,14 @@ async def login_user(login_data: LoginRequest, db: Session = Depends(get_db)):
         
         logger.info(f"User logged in: {user.username}")
         return Token(access_token=access_token, refresh_token=refresh_token, token_type="bearer")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Login failed: {e}")
         raise HTTPException(status_code=500, detail="Login failed")
 
 @app.post("/auth/refresh", response_model=Token)
-async def refresh_token(refresh_data: RefreshTokenRequest, db: Session = Depends(get_db)):
+def refresh_token(refresh_data: RefreshTokenRequest, db: Session = Depends(get_db)):
     try:
         token_data = auth.auth_manager.verify_token(refresh_data.refresh_token)
         if not token_data or token_data.token_type != "refresh":
@@ -135,7 +177,7 @@ async def websocket_endpoint(websocket: WebSocket, file_id: str):
         manager.disconnect(websocket, file_id)
 
 @app.post("/files", response_model=FileUploadResponse)
-async def upload_file(
+def upload_file(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: models.User = Depends(auth.get_current_active_user),
@@ -154,15 +196,14 @@ async def upload_file(
         
         os.makedirs("uploads", exist_ok=True)
         
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        file_size = utils.save_upload_file(file.file, file_path)
         
         file_data = {
             "id": file_id,
             "filename": f"{file_id}_{file.filename}",
             "original_filename": file.filename,
             "file_type": file_type,
-            "file_size": os.path.getsize(file_path),
+            "file_size": file_size,
             "status": "uploading",
             "progress": 0,
             "owner_id": current_user.id
@@ -170,6 +211,7 @@ async def upload_file(
         
         db_file = crud.create_file(db, file_data)
         
+        utils.track_processing(file_id)
         background_tasks.add_task(
             utils.simulate_file_processing, db, file_id, file_path, file_type
         )
@@ -186,18 +228,28 @@ async def upload_file(
         logger.error(f"File upload failed: {e}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+async def get_owned_file(db: Session, file_id: str, owner_id: int, wait_ready: float):
+    db_file = await run_in_threadpool(crud.get_file_by_owner, db, file_id, owner_id)
+    if db_file and wait_ready and db_file.status not in ("ready", "failed"):
+        # Hand the pooled connection back while long-polling, then re-read the row.
+        await run_in_threadpool(db.rollback)
+        await utils.wait_for_processing(file_id, wait_ready)
+        db_file = await run_in_threadpool(crud.get_file_by_owner, db, file_id, owner_id)
+    return db_file
+
 @app.get("/files/{file_id}/progress", response_model=FileProgress)
 async def get_file_progress(
     file_id: str, 
+    wait_ready: float = Query(default=0, ge=0, le=MAX_WAIT_READY_SECONDS, description="Seconds to wait for processing to finish"),
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
     try:
-        db_file = crud.get_file_by_owner(db, file_id, current_user.id)
+        db_file = await get_owned_file(db, file_id, current_user.id, wait_ready)
         if not db_file:
             raise HTTPException(status_code=404, detail="File not found")
         
-        return FileProgress(
+        return FileProgress.model_construct(
             file_id=file_id,
             status=db_file.status,
             progress=db_file.progress,
@@ -210,11 +262,12 @@ async def get_file_progress(
 @app.get("/files/{file_id}", response_model=FileContent)
 async def get_file_content(
     file_id: str, 
+    wait_ready: float = Query(default=0, ge=0, le=MAX_WAIT_READY_SECONDS, description="Seconds to wait for processing to finish"),
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
     try:
-        db_file = crud.get_file_by_owner(db, file_id, current_user.id)
+        db_file = await get_owned_file(db, file_id, current_user.id, wait_ready)
         if not db_file:
             raise HTTPException(status_code=404, detail="File not found")
         
@@ -226,19 +279,12 @@ async def get_file_content(
                 message="File is still being processed"
             )
         
-        try:
-            content = json.loads(db_file.content) if db_file.content else None
-            file_metadata = json.loads(db_file.file_metadata) if db_file.file_metadata else None
-        except json.JSONDecodeError:
-            content = None
-            file_metadata = None
-        
         return FileContent(
             file_id=file_id,
             filename=db_file.original_filename,
             status=db_file.status,
-            content=content,
-            file_metadata=file_metadata,
+            content=await run_in_threadpool(crud.get_file_content, db, file_id),
+            file_metadata=db_file.file_metadata,
             processing_time=db_file.processing_time
         )
     except Exception as e:
@@ -246,7 +292,7 @@ async def get_file_content(
         raise HTTPException(status_code=500, detail="Failed to get content")
 
 @app.get("/files", response_model=FileList)
-async def list_user_files(
+def list_user_files(
     limit: int = Query(default=50, ge=1, le=100, description="Maximum number of files to return"),
     offset: int = Query(default=0, ge=0, description="Number of files to skip"),
     file_type: Optional[str] = Query(None, description="Filter by file type"),
@@ -255,38 +301,15 @@ async def list_user_files(
     db: Session = Depends(get_db)
 ):
     try:
-        files = crud.list_files_by_owner(db, current_user.id, limit, offset)
+        files = crud.list_files_by_owner(db, current_user.id, limit, offset, file_type=file_type, status=status)
         
-        if file_type:
-            files = [f for f in files if f.file_type == file_type]
-        if status:
-            files = [f for f in files if f.status == status]
-        
-        file_list = []
-        for f in files:
-            file_list.append(FileBase(
-                id=f.id,
-                filename=f.filename,
-                original_filename=f.original_filename,
-                file_type=f.file_type,
-                file_size=f.file_size,
-                status=f.status,
-                progress=f.progress,
-                error_message=f.error_message,
-                file_metadata=f.file_metadata,
-                processing_time=f.processing_time,
-                created_at=f.created_at,
-                updated_at=f.updated_at,
-                processed_at=f.processed_at
-            ))
-        
-        return FileList(files=file_list, total=len(file_list))
+        return file_list_response(files)
     except Exception as e:
         logger.error(f"File listing failed: {e}")
         raise HTTPException(status_code=500, detail="Failed to list files")
 
 @app.get("/files/search", response_model=FileList)
-async def search_files(
+def search_files(
     query: str = Query(..., description="Search query for filename or content"),
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
@@ -294,31 +317,13 @@ async def search_files(
     try:
         files = crud.search_files(db, current_user.id, query)
         
-        file_list = []
-        for f in files:
-            file_list.append(FileBase(
-                id=f.id,
-                filename=f.filename,
-                original_filename=f.original_filename,
-                file_type=f.file_type,
-                file_size=f.file_size,
-                status=f.status,
-                progress=f.progress,
-                error_message=f.error_message,
-                file_metadata=f.file_metadata,
-                processing_time=f.processing_time,
-                created_at=f.created_at,
-                updated_at=f.updated_at,
-                processed_at=f.processed_at
-            ))
-        
-        return FileList(files=file_list, total=len(file_list))
+        return file_list_response(files)
     except Exception as e:
         logger.error(f"File search failed: {e}")
         raise HTTPException(status_code=500, detail="Search failed")
 
 @app.get("/files/stats", response_model=dict)
-async def get_file_statistics(
+def get_file_statistics(
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -330,7 +335,7 @@ async def get_file_statistics(
         raise HTTPException(status_code=500, detail="Failed to get statistics")
 
 @app.delete("/files/{file_id}", response_model=DeleteResponse)
-async def delete_file(
+def delete_file(
     file_id: str, 
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
@@ -362,15 +367,12 @@ async def get_current_user_profile(
     return current_user
 
 @app.get("/users", response_model=List[UserResponse])
-async def list_users(
-    current_user: models.User = Depends(auth.require_admin)
+def list_users(
+    current_user: models.User = Depends(auth.require_admin),
+    db: Session = Depends(get_db)
 ):
     try:
-        from .database import SessionLocal
-        db = SessionLocal()
-        users = crud.list_users(db)
-        db.close()
-        return users
+        return crud.list_users(db)
     except Exception as e:
         logger.error(f"User listing failed: {e}")
         raise HTTPException(status_code=500, detail="Failed to list users")
@@ -378,11 +380,11 @@ async def list_users(
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     logger.error(f"Global exception: {exc}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content=ErrorResponse(
             success=False,
             message="Internal server error",
             error=str(exc)
-        ).dict()
+        ).model_dump()
     )
\ No newline at end of file
@@ -1,10 +1,16 @@
-from sqlalchemy import Column, String, Integer, DateTime, Text, Boolean, ForeignKey, Index
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey, Index, JSON, event, inspect, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
 
+# Parsed documents are stored natively (JSONB on PostgreSQL) instead of as JSON-encoded text.
+JSONDocument = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
 class User(Base):
     __tablename__ = "users"
+    # Fetch server-side defaults with the INSERT itself (RETURNING) instead of a follow-up SELECT.
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
@@ -20,6 +26,7 @@ class User(Base):
 
 class File(Base):
     __tablename__ = "files"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(String, primary_key=True, index=True)
     filename = Column(String, index=True, nullable=False)
@@ -28,9 +35,8 @@ class File(Base):
     file_size = Column(Integer, nullable=True)
     status = Column(String, default="uploading", nullable=False)
     progress = Column(Integer, default=0, nullable=False)
-    content = Column(Text, nullable=True)
     error_message = Column(String, nullable=True)
-    file_metadata = Column(Text, nullable=True)
+    file_metadata = Column(JSONDocument, nullable=True)
     processing_time = Column(Integer, nullable=True)
     
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -40,8 +46,105 @@ class File(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     processed_at = Column(DateTime(timezone=True), nullable=True)
 
+class FilePayload(Base):
+    """Parsed document for a file, kept out of the hot ``files`` row that progress updates rewrite."""
+    __tablename__ = "file_payloads"
+
+    file_id = Column(String, ForeignKey("files.id", ondelete="CASCADE"), primary_key=True)
+    content = Column(JSONDocument, nullable=True)
+
 Index("idx_files_owner_status", File.owner_id, File.status)
-Index("idx_files_created_at", File.created_at)
+# Serves list/search ORDER BY created_at DESC per owner; on PostgreSQL the listing becomes an index-only scan.
+OWNER_CREATED_INDEX = Index(
+    "idx_files_owner_created",
+    File.owner_id,
+    File.created_at.desc(),
+    postgresql_include=["file_type", "status", "file_size", "progress", "updated_at"]
+)
 Index("idx_files_file_type", File.file_type)
 Index("idx_users_username", User.username)
-Index("idx_users_email", User.email)
\ No newline at end of file
+Index("idx_users_email", User.email)
+
+# Full-text search over filename + parsed content. The FTS table keeps its own copy of the
+# text (content lives in file_payloads, filename in files), synced by triggers on both tables.
+SQLITE_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(original_filename, content)""",
+    """CREATE TRIGGER IF NOT EXISTS files_fts_ai AFTER INSERT ON files BEGIN
+        INSERT INTO files_fts(rowid, original_filename, content) VALUES (new.rowid, new.original_filename, '');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS files_fts_ad AFTER DELETE ON files BEGIN
+        DELETE FROM files_fts WHERE rowid = old.rowid;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS files_fts_au AFTER UPDATE OF original_filename ON files BEGIN
+        UPDATE files_fts SET original_filename = new.original_filename WHERE rowid = new.rowid;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS file_payloads_fts_ai AFTER INSERT ON file_payloads BEGIN
+        UPDATE files_fts SET content = coalesce(new.content, '')
+        WHERE rowid = (SELECT rowid FROM files WHERE id = new.file_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS file_payloads_fts_au AFTER UPDATE OF content ON file_payloads BEGIN
+        UPDATE files_fts SET content = coalesce(new.content, '')
+        WHERE rowid = (SELECT rowid FROM files WHERE id = new.file_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS file_payloads_fts_ad AFTER DELETE ON file_payloads BEGIN
+        UPDATE files_fts SET content = ''
+        WHERE rowid = (SELECT rowid FROM files WHERE id = old.file_id);
+    END""",
+]
+SQLITE_FTS_REBUILD = """INSERT INTO files_fts(rowid, original_filename, content)
+    SELECT files.rowid, files.original_filename, coalesce(file_payloads.content, '')
+    FROM files LEFT JOIN file_payloads ON file_payloads.file_id = files.id"""
+
+POSTGRES_FILENAME_DOCUMENT = "to_tsvector('simple', coalesce(original_filename, ''))"
+POSTGRES_CONTENT_DOCUMENT = "to_tsvector('simple', coalesce(content::text, ''))"
+POSTGRES_FTS_DDL = [
+    f"CREATE INDEX IF NOT EXISTS idx_files_filename_fts ON files USING GIN ({POSTGRES_FILENAME_DOCUMENT})",
+    f"CREATE INDEX IF NOT EXISTS idx_file_payloads_fts ON file_payloads USING GIN ({POSTGRES_CONTENT_DOCUMENT})",
+]
+
+def migrate_inline_content(connection):
+    """Move parsed content still stored on ``files.content`` (older databases) into file_payloads."""
+    columns = {column["name"] for column in inspect(connection).get_columns("files")}
+    if "content" not in columns:
+        return
+    # The legacy column is JSON-encoded text; PostgreSQL needs an explicit cast into JSONB.
+    content = "content::jsonb" if connection.dialect.name == "postgresql" else "content"
+    connection.execute(text(
+        f"""INSERT INTO file_payloads (file_id, content)
+        SELECT id, {content} FROM files
+        WHERE content IS NOT NULL AND id NOT IN (SELECT file_id FROM file_payloads)"""
+    ))
+    connection.execute(text("UPDATE files SET content = NULL WHERE content IS NOT NULL"))
+
+def create_search_index(connection):
+    inspector = inspect(connection)
+    if not inspector.has_table("files") or not inspector.has_table("file_payloads"):
+        return
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        created = not inspector.has_table("files_fts")
+        for statement in SQLITE_FTS_DDL:
+            connection.execute(text(statement))
+        if created:
+            connection.execute(text(SQLITE_FTS_REBUILD))
+    elif dialect == "postgresql":
+        for statement in POSTGRES_FTS_DDL:
+            connection.execute(text(statement))
+
+def migrate_indexes(connection):
+    """Bring indexes on databases created before the (owner_id, created_at) index up to date."""
+    # create_all skips existing tables, so their new indexes have to be added here.
+    OWNER_CREATED_INDEX.create(connection, checkfirst=True)
+    connection.execute(text("DROP INDEX IF EXISTS idx_files_created_at"))
+
+def prepare_database(connection):
+    if not inspect(connection).has_table("files"):
+        return
+    FilePayload.__table__.create(connection, checkfirst=True)
+    migrate_indexes(connection)
+    migrate_inline_content(connection)
+    create_search_index(connection)
+
+@event.listens_for(FilePayload.__table__, "after_create")
+def _create_search_index_after_payloads(target, connection, **kw):
+    create_search_index(connection)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
@@ -17,13 +17,12 @@ class UserUpdate(BaseModel):
     is_active: Optional[bool] = None
 
 class UserResponse(UserBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
-
 class Token(BaseModel):
     access_token: str
     refresh_token: str
@@ -41,6 +40,8 @@ class RefreshTokenRequest(BaseModel):
     refresh_token: str
 
 class FileBase(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: str
     filename: str
     original_filename: str
@@ -49,15 +50,12 @@ class FileBase(BaseModel):
     status: str
     progress: int
     error_message: Optional[str] = None
-    file_metadata: Optional[str] = None
+    file_metadata: Optional[Dict[str, Any]] = None
     processing_time: Optional[int] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     processed_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
-
 class FileUploadResponse(BaseModel):
     file_id: str
     filename: str
@@ -73,7 +71,7 @@ class FileContent(BaseModel):
     file_id: str
     filename: str
     status: str
-    content: Optional[List[Dict[str, Any]]] = None
+    content: Optional[Dict[str, Any]] = None
     file_metadata: Optional[Dict[str, Any]] = None
     message: Optional[str] = None
     error_message: Optional[str] = None
@@ -1,76 +1,248 @@
-import json
 import os
+import re
+import io
+import mmap
 import logging
 from datetime import datetime
+from functools import lru_cache
 from sqlalchemy.orm import Session
 from . import crud
+from .database import json_loads
 from .websocket import manager
 from typing import Dict, Any, Optional
 import openpyxl
-from PyPDF2 import PdfReader
+import pypdfium2 as pdfium
 import time
 import asyncio
-import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from fastapi.concurrency import run_in_threadpool
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
 
 logger = logging.getLogger(__name__)
 
-def parse_csv_file(file_path: str) -> Dict[str, Any]:
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+# Forking the threaded server process can copy held locks into the child; start workers clean instead.
+_PARSE_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+parse_executor = ProcessPoolExecutor(
+    max_workers=PARSE_WORKERS,
+    mp_context=multiprocessing.get_context(_PARSE_START_METHOD)
+)
+
+UPLOAD_COPY_BUFFER_SIZE = 1024 * 1024
+
+def _sendfile_fd(source) -> Optional[int]:
+    # SpooledTemporaryFile.fileno() forces a rollover, so only use it once it is already on disk.
+    if not hasattr(os, "sendfile") or not getattr(source, "_rolled", True):
+        return None
     try:
-        import pandas as pd
-        df = pd.read_csv(file_path)
-        
-        data = {
-            "rows": df.to_dict('records'),
-            "row_count": len(df),
-            "column_count": len(df.columns),
-            "columns": df.columns.tolist(),
-            "data_types": df.dtypes.astype(str).to_dict()
-        }
-        
+        return source.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+def save_upload_file(source, destination_path: str) -> int:
+    """Write an upload to disk and return the number of bytes written."""
+    source.seek(0)
+    src_fd = _sendfile_fd(source)
+    offset = 0
+    with open(destination_path, "wb") as destination:
+        if src_fd is not None:
+            dst_fd = destination.fileno()
+            try:
+                while True:
+                    sent = os.sendfile(dst_fd, src_fd, offset, UPLOAD_COPY_BUFFER_SIZE * 8)
+                    if sent == 0:
+                        return offset
+                    offset += sent
+            except OSError:
+                # Platforms where sendfile needs a socket target: finish with a buffered copy.
+                source.seek(offset)
+                destination.seek(offset)
+        read = source.read
+        write = destination.write
+        while True:
+            chunk = read(UPLOAD_COPY_BUFFER_SIZE)
+            if not chunk:
+                return offset
+            write(chunk)
+            offset += len(chunk)
+
+WORD_PATTERN = re.compile(r"\S+")
+
+JSON_MMAP_THRESHOLD = 50 * 1024 * 1024
+
+CSV_CHUNK_ROWS = 50_000
+CSV_BLOCK_SIZE = 1 << 20
+
+def _read_csv_arrow(file_path: str, max_rows: Optional[int], return_rows: bool) -> Dict[str, Any]:
+    reader = pa_csv.open_csv(
+        file_path,
+        read_options=pa_csv.ReadOptions(use_threads=True, block_size=CSV_BLOCK_SIZE)
+    )
+    rows = []
+    row_count = 0
+
+    for batch in reader:
+        if max_rows is not None:
+            remaining = max_rows - row_count
+            if remaining <= 0:
+                break
+            if batch.num_rows > remaining:
+                batch = batch.slice(0, remaining)
+        row_count += batch.num_rows
+        if return_rows:
+            rows.extend(batch.to_pylist())
+
+    return {
+        "rows": rows,
+        "row_count": row_count,
+        "column_count": len(reader.schema),
+        "columns": reader.schema.names,
+        "data_types": {field.name: str(field.type) for field in reader.schema}
+    }
+
+def _read_csv_pandas(file_path: str, max_rows: Optional[int], return_rows: bool) -> Dict[str, Any]:
+    import pandas as pd
+    rows = []
+    row_count = 0
+    columns = []
+    data_types = {}
+
+    with pd.read_csv(file_path, chunksize=CSV_CHUNK_ROWS, nrows=max_rows) as reader:
+        for chunk in reader:
+            if not columns:
+                columns = chunk.columns.tolist()
+                data_types = chunk.dtypes.astype(str).to_dict()
+            row_count += len(chunk)
+            if return_rows:
+                rows.extend(chunk.to_dict('records'))
+
+    return {
+        "rows": rows,
+        "row_count": row_count,
+        "column_count": len(columns),
+        "columns": columns,
+        "data_types": data_types
+    }
+
+def parse_csv_file(file_path: str, max_rows: Optional[int] = None, return_rows: bool = True) -> Dict[str, Any]:
+    try:
+        data = None
+        if pa_csv is not None:
+            try:
+                data = _read_csv_arrow(file_path, max_rows, return_rows)
+            except pa.ArrowInvalid:
+                # Arrow fixes column types from the first block; pandas copes with later type changes.
+                data = None
+        if data is None:
+            data = _read_csv_pandas(file_path, max_rows, return_rows)
         return {"success": True, "data": data}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def parse_excel_file(file_path: str) -> Dict[str, Any]:
+def parse_excel_file(file_path: str, max_rows: Optional[int] = None, return_rows: bool = True) -> Dict[str, Any]:
+    workbook = None
     try:
-        import pandas as pd
-        df = pd.read_excel(file_path)
-        
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        values = workbook.active.iter_rows(values_only=True)
+
+        header = next(values, ())
+        columns = [
+            str(name) if name is not None else f"Unnamed: {index}"
+            for index, name in enumerate(header)
+        ]
+        rows = []
+        row_count = 0
+        data_types = {}
+
+        for values_row in values:
+            if max_rows is not None and row_count >= max_rows:
+                break
+            if not row_count:
+                data_types = {name: type(value).__name__ for name, value in zip(columns, values_row)}
+            row_count += 1
+            if return_rows:
+                rows.append(dict(zip(columns, values_row)))
+
         data = {
-            "rows": df.to_dict('records'),
-            "row_count": len(df),
-            "column_count": len(df.columns),
-            "columns": df.columns.tolist(),
-            "data_types": df.dtypes.astype(str).to_dict()
+            "rows": rows,
+            "row_count": row_count,
+            "column_count": len(columns),
+            "columns": columns,
+            "data_types": data_types
         }
-        
+
         return {"success": True, "data": data}
     except Exception as e:
         return {"success": False, "error": str(e)}
+    finally:
+        if workbook is not None:
+            workbook.close()
 
-def parse_pdf_file(file_path: str) -> Dict[str, Any]:
+def _extract_page_text(page) -> str:
+    textpage = page.get_textpage()
     try:
-        reader = PdfReader(file_path)
-        text_content = ""
-        
-        for page in reader.pages:
-            text_content += page.extract_text()
-        
+        return textpage.get_text_range()
+    finally:
+        textpage.close()
+        page.close()
+
+def _pdfium_page_texts(file_path: str):
+    # Opening by path lets PDFium read the file itself instead of through a Python buffer.
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        for index in range(len(pdf)):
+            yield _extract_page_text(pdf[index])
+    finally:
+        pdf.close()
+
+def parse_pdf_file(file_path: str, return_text: bool = True) -> Dict[str, Any]:
+    page_texts = _pdfium_page_texts(file_path)
+    try:
+        parts = []
+        page_count = 0
+        word_count = 0
+        character_count = 0
+
+        for page_text in page_texts:
+            page_count += 1
+            word_count += sum(1 for _ in WORD_PATTERN.finditer(page_text))
+            character_count += len(page_text)
+            if return_text:
+                parts.append(page_text)
+
         data = {
-            "text": text_content,
-            "page_count": len(reader.pages),
-            "word_count": len(text_content.split()),
-            "character_count": len(text_content)
+            "text": "".join(parts),
+            "page_count": page_count,
+            "word_count": word_count,
+            "character_count": character_count
         }
-        
+
         return {"success": True, "data": data}
     except Exception as e:
         return {"success": False, "error": str(e)}
+    finally:
+        page_texts.close()
+
+def _load_json(file_path: str) -> Any:
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < JSON_MMAP_THRESHOLD:
+            return json_loads(f.read())
+        # Large documents are parsed straight from the page cache instead of copied into bytes first.
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                return json_loads(view)
 
 def parse_json_file(file_path: str) -> Dict[str, Any]:
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        json_data = _load_json(file_path)
         
         if isinstance(json_data, list):
             data = {
@@ -78,6 +250,10 @@ def parse_json_file(file_path: str) -> Dict[str, Any]:
                 "items": json_data,
                 "item_count": len(json_data)
             }
+            # Arrays of records report columns from the first record, like the tabular parsers.
+            if json_data and isinstance(json_data[0], dict):
+                data["columns"] = list(json_data[0])
+                data["column_count"] = len(data["columns"])
         elif isinstance(json_data, dict):
             data = {
                 "type": "object",
@@ -95,126 +271,149 @@ def parse_json_file(file_path: str) -> Dict[str, Any]:
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+_PARSERS = {
+    "csv": parse_csv_file,
+    "excel": parse_excel_file,
+    "pdf": parse_pdf_file,
+    "json": parse_json_file
+}
+
+_EXTENSION_TYPES = {
+    "csv": "csv",
+    "xlsx": "excel",
+    "xls": "excel",
+    "pdf": "pdf",
+    "json": "json"
+}
+
 def parse_file_by_type(file_path: str, file_type: str) -> Dict[str, Any]:
-    if file_type == "csv":
-        return parse_csv_file(file_path)
-    elif file_type == "excel":
-        return parse_excel_file(file_path)
-    elif file_type == "pdf":
-        return parse_pdf_file(file_path)
-    elif file_type == "json":
-        return parse_json_file(file_path)
-    else:
+    parser = _PARSERS.get(file_type)
+    if parser is None:
         return {"success": False, "error": f"Unsupported file type: {file_type}"}
+    return parser(file_path)
 
 def validate_file_type(file_type: str) -> bool:
-    supported_types = ["csv", "excel", "pdf", "json"]
-    return file_type in supported_types
+    return file_type in _PARSERS
 
 def get_file_type(filename: str) -> str:
     if not filename:
         return "unknown"
-    
-    extension = filename.lower().split('.')[-1]
-    
-    if extension in ['csv']:
-        return "csv"
-    elif extension in ['xlsx', 'xls']:
-        return "excel"
-    elif extension in ['pdf']:
-        return "pdf"
-    elif extension in ['json']:
-        return "json"
-    else:
-        return "unknown"
+
+    return _EXTENSION_TYPES.get(filename.rpartition('.')[2].lower(), "unknown")
+
+@lru_cache(maxsize=4096)
+def _stat_metadata(file_type: str, file_size: int, ctime: float, mtime: float) -> Dict[str, Any]:
+    return {
+        "file_size": file_size,
+        "created_time": datetime.fromtimestamp(ctime).isoformat(),
+        "modified_time": datetime.fromtimestamp(mtime).isoformat(),
+        "file_type": file_type
+    }
 
 def get_file_metadata(file_path: str, file_type: str) -> Dict[str, Any]:
     try:
         file_stat = os.stat(file_path)
-        metadata = {
-            "file_size": file_stat.st_size,
-            "created_time": datetime.fromtimestamp(file_stat.st_ctime).isoformat(),
-            "modified_time": datetime.fromtimestamp(file_stat.st_mtime).isoformat(),
-            "file_type": file_type
-        }
-        return metadata
+        # Keyed on the stat fields, so a rewritten file produces a fresh entry.
+        return dict(_stat_metadata(file_type, file_stat.st_size, file_stat.st_ctime, file_stat.st_mtime))
     except Exception as e:
         logger.error(f"Error getting file metadata: {e}")
         return {}
 
-def simulate_file_processing(db: Session, file_id: str, file_path: str, file_type: str):
+# Set once a file's background processing finishes, for requests long-polling on it.
+_processing_done: Dict[str, Optional[asyncio.Event]] = {}
+
+def track_processing(file_id: str):
+    # Called from the sync upload handler's worker thread, where Python < 3.10 cannot create
+    # an asyncio.Event (no current loop); the Event itself is created on the loop by the waiter.
+    _processing_done.setdefault(file_id, None)
+
+async def wait_for_processing(file_id: str, timeout: float):
+    if file_id not in _processing_done:
+        return
+    event = _processing_done[file_id]
+    if event is None:
+        event = _processing_done[file_id] = asyncio.Event()
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+
+def _remove_upload(file_path: str):
+    try:
+        os.unlink(file_path)
+    except FileNotFoundError:
+        return
+    logger.info(f"Temporary file {file_path} cleaned up")
+
+async def simulate_file_processing(db: Session, file_id: str, file_path: str, file_type: str):
     start_time = time.time()
-    
-    def run_async_operations():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            loop.run_until_complete(manager.broadcast_file_status(file_id, {
+
+    try:
+        await manager.broadcast_file_status(file_id, {
+            "status": "processing",
+            "message": "File processing started"
+        })
+
+        # DB writes (and serializing the parsed payload) are synchronous, so they run on a worker thread.
+        await run_in_threadpool(crud.update_file_progress, db, file_id, 0, "processing")
+
+        progress_steps = [20, 40, 60, 80]
+        for progress in progress_steps:
+            await asyncio.sleep(1)
+            await run_in_threadpool(
+                crud.update_file_progress, db, file_id, progress,
+                processing_time=int(time.time() - start_time)
+            )
+            await manager.broadcast_progress(file_id, {
                 "status": "processing",
-                "message": "File processing started"
-            }))
-            
-            crud.update_file_progress(db, file_id, 0, "processing")
-            
-            progress_steps = [20, 40, 60, 80]
-            for progress in progress_steps:
-                time.sleep(1)
-                crud.update_file_progress(db, file_id, progress, processing_time=int(time.time() - start_time))
-                loop.run_until_complete(manager.broadcast_progress(file_id, {
-                    "status": "processing",
-                    "progress": progress,
-                    "processing_time": int(time.time() - start_time)
-                }))
-            
-            result = parse_file_by_type(file_path, file_type)
-            
-            if result["success"]:
-                content_json = json.dumps(result["data"])
-                file_metadata_json = json.dumps({
-                    "file_type": file_type,
-                    "processing_time": result["data"].get("processing_time", 0),
-                    "row_count": result["data"].get("row_count", 0),
-                    "column_count": result["data"].get("column_count", 0)
-                })
-                
-                crud.update_file_content(
-                    db, file_id, content_json, file_metadata_json, 
-                    "ready", int(time.time() - start_time)
-                )
-                
-                loop.run_until_complete(manager.broadcast_file_status(file_id, {
-                    "status": "ready",
-                    "message": "File processed successfully",
-                    "processing_time": int(time.time() - start_time)
-                }))
-                
-                logger.info(f"File {file_id} processed successfully in {time.time() - start_time:.2f}s")
-            else:
-                crud.update_file_error(db, file_id, f"Parsing failed: {result['error']}")
-                loop.run_until_complete(manager.broadcast_file_status(file_id, {
-                    "status": "failed",
-                    "error_message": f"Parsing failed: {result['error']}"
-                }))
-                logger.error(f"File {file_id} processing failed: {result['error']}")
-                
-        except Exception as e:
-            error_msg = f"Processing failed: {str(e)}"
-            crud.update_file_error(db, file_id, error_msg)
-            try:
-                loop.run_until_complete(manager.broadcast_file_status(file_id, {
-                    "status": "failed",
-                    "error_message": error_msg
-                }))
-            except:
-                pass
-            logger.error(f"File {file_id} processing failed: {e}")
-        finally:
-            loop.close()
-    
-    thread = threading.Thread(target=run_async_operations)
-    thread.start()
-    thread.join()
-    
-    if os.path.exists(file_path):
-        os.remove(file_path)
-        logger.info(f"Temporary file {file_path} cleaned up")
\ No newline at end of file
+                "progress": progress,
+                "processing_time": int(time.time() - start_time)
+            })
+
+        result = await asyncio.wrap_future(parse_executor.submit(parse_file_by_type, file_path, file_type))
+
+        if result["success"]:
+            file_metadata = {
+                "file_type": file_type,
+                "processing_time": result["data"].get("processing_time", 0),
+                "row_count": result["data"].get("row_count", 0),
+                "column_count": result["data"].get("column_count", 0)
+            }
+
+            await run_in_threadpool(
+                crud.update_file_content, db, file_id, result["data"], file_metadata,
+                "ready", int(time.time() - start_time)
+            )
+
+            await manager.broadcast_file_status(file_id, {
+                "status": "ready",
+                "message": "File processed successfully",
+                "processing_time": int(time.time() - start_time)
+            })
+
+            logger.info(f"File {file_id} processed successfully in {time.time() - start_time:.2f}s")
+        else:
+            await run_in_threadpool(crud.update_file_error, db, file_id, f"Parsing failed: {result['error']}")
+            await manager.broadcast_file_status(file_id, {
+                "status": "failed",
+                "error_message": f"Parsing failed: {result['error']}"
+            })
+            logger.error(f"File {file_id} processing failed: {result['error']}")
+
+    except Exception as e:
+        error_msg = f"Processing failed: {str(e)}"
+        await run_in_threadpool(crud.update_file_error, db, file_id, error_msg)
+        try:
+            await manager.broadcast_file_status(file_id, {
+                "status": "failed",
+                "error_message": error_msg
+            })
+        except Exception:
+            pass
+        logger.error(f"File {file_id} processing failed: {e}")
+    finally:
+        done = _processing_done.pop(file_id, None)
+        if done is not None:
+            done.set()
+        # Unlinking can block on the filesystem, so keep it off the event loop.
+        await run_in_threadpool(_remove_upload, file_path)
\ No newline at end of file
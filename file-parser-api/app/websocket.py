@@ -1,25 +1,49 @@
-import json
+import os
+import time
+import orjson
 import asyncio
-from typing import Dict, Set, Optional
+from typing import Dict, List, Optional
 from fastapi import WebSocket, WebSocketDisconnect
+from dataclasses import dataclass
 from datetime import datetime
 
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "5"))
+WS_BROADCAST_BATCH_SIZE = 50
+
+# Broadcasts within the same millisecond share one formatted timestamp.
+_timestamp_cache = [0.0, ""]
+
+def _now_iso() -> str:
+    now = time.time()
+    if now - _timestamp_cache[0] >= 0.001:
+        _timestamp_cache[0] = now
+        _timestamp_cache[1] = datetime.fromtimestamp(now).isoformat(timespec="milliseconds")
+    return _timestamp_cache[1]
+
+@dataclass
+class ConnectionInfo:
+    # Declared by hand: dataclass(slots=True) needs Python 3.10 and we support 3.8+.
+    __slots__ = ("file_id", "connected_at")
+
+    file_id: str
+    connected_at: float
+
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
-        self.connection_info: Dict[WebSocket, Dict] = {}
+        self.active_connections: Dict[str, List[WebSocket]] = {}
+        self.connection_info: Dict[WebSocket, ConnectionInfo] = {}
 
     async def connect(self, websocket: WebSocket, file_id: str):
         await websocket.accept()
-        if file_id not in self.active_connections:
-            self.active_connections[file_id] = set()
-        self.active_connections[file_id].add(websocket)
-        self.connection_info[websocket] = {"file_id": file_id, "connected_at": datetime.now()}
+        self.active_connections.setdefault(file_id, []).append(websocket)
+        self.connection_info[websocket] = ConnectionInfo(file_id, time.monotonic())
 
     def disconnect(self, websocket: WebSocket, file_id: str):
-        if file_id in self.active_connections:
-            self.active_connections[file_id].discard(websocket)
-            if not self.active_connections[file_id]:
+        connections = self.active_connections.get(file_id)
+        if connections is not None:
+            if websocket in connections:
+                connections.remove(websocket)
+            if not connections:
                 del self.active_connections[file_id]
         
         if websocket in self.connection_info:
@@ -29,44 +53,52 @@ class ConnectionManager:
         try:
             await websocket.send_text(message)
         except Exception as e:
-            self.disconnect(websocket, self.connection_info.get(websocket, {}).get("file_id", "unknown"))
+            info = self.connection_info.get(websocket)
+            self.disconnect(websocket, info.file_id if info else "unknown")
 
-    async def broadcast_progress(self, file_id: str, message: dict):
-        if file_id in self.active_connections:
-            disconnected = set()
-            for connection in self.active_connections[file_id]:
-                try:
-                    await connection.send_text(json.dumps({
-                        "type": "progress_update",
-                        "file_id": file_id,
-                        "data": message,
-                        "timestamp": datetime.now().isoformat()
-                    }))
-                except Exception:
-                    disconnected.add(connection)
-            
-            for connection in disconnected:
+    async def _broadcast(self, file_id: str, message_type: str, message: dict):
+        connections = self.active_connections.get(file_id)
+        if not connections:
+            return
+        # Snapshot before any await so connects/disconnects during the send cannot disturb iteration.
+        connections = tuple(connections)
+        # Serialize once per broadcast rather than once per subscriber.
+        payload = orjson.dumps({
+            "type": message_type,
+            "file_id": file_id,
+            "data": message,
+            "timestamp": _now_iso()
+        }).decode("utf-8")
+
+        async def safe_send(connection: WebSocket) -> bool:
+            try:
+                await asyncio.wait_for(connection.send_text(payload), WS_SEND_TIMEOUT_SECONDS)
+                return True
+            except Exception:
+                return False
+
+        # Send concurrently so one slow subscriber does not hold up the others.
+        if len(connections) <= WS_BROADCAST_BATCH_SIZE:
+            results = await asyncio.gather(*map(safe_send, connections))
+        else:
+            # Large fanouts go out in batches, yielding to the loop between them.
+            results = []
+            for start in range(0, len(connections), WS_BROADCAST_BATCH_SIZE):
+                batch = connections[start:start + WS_BROADCAST_BATCH_SIZE]
+                results.extend(await asyncio.gather(*map(safe_send, batch)))
+                await asyncio.sleep(0)
+        for connection, delivered in zip(connections, results):
+            if not delivered:
                 self.disconnect(connection, file_id)
 
+    async def broadcast_progress(self, file_id: str, message: dict):
+        await self._broadcast(file_id, "progress_update", message)
+
     async def broadcast_file_status(self, file_id: str, message: dict):
-        if file_id in self.active_connections:
-            disconnected = set()
-            for connection in self.active_connections[file_id]:
-                try:
-                    await connection.send_text(json.dumps({
-                        "type": "status_update",
-                        "file_id": file_id,
-                        "data": message,
-                        "timestamp": datetime.now().isoformat()
-                    }))
-                except Exception:
-                    disconnected.add(connection)
-            
-            for connection in disconnected:
-                self.disconnect(connection, file_id)
+        await self._broadcast(file_id, "status_update", message)
 
     def get_connection_count(self, file_id: str) -> int:
-        return len(self.active_connections.get(file_id, set()))
+        return len(self.active_connections.get(file_id, ()))
 
     def get_total_connections(self) -> int:
         return sum(len(connections) for connections in self.active_connections.values())
@@ -10,6 +10,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from app.database import get_db, engine
 from app.models import Base, User, File
 from app import crud
+from app.auth import auth_manager
 from app.schemas import UserCreate, FileBase
 
 def test_database_connection():
@@ -53,7 +54,7 @@ def test_user_crud():
             full_name="Test User CRUD New"
         )
         
-        user = crud.create_user(db, user_data)
+        user = auth_manager.create_user(db, user_data)
         print(f"✅ User created: {user.username}")
         
         # Test user retrieval
@@ -118,8 +119,10 @@ def test_file_crud():
         print(f"✅ File retrieved: {retrieved_file.filename}")
         
         # Test file progress update
-        updated_file = crud.update_file_progress(db, file_id, 50, "processing")
-        print(f"✅ File progress updated: {updated_file.progress}%")
+        crud.update_file_progress(db, file_id, 50, "processing")
+        # The bulk UPDATE skips the identity map, so reload the row to see the new value
+        db.refresh(retrieved_file)
+        print(f"✅ File progress updated: {retrieved_file.progress}%")
         
         # Test file listing
         files = crud.list_files_by_owner(db, user.id)
@@ -29,7 +29,7 @@ def test_imports():
         return False
     
     try:
-        from app.crud import create_user, get_user, create_file
+        from app.crud import get_user, create_file
         print("✅ CRUD import successful")
     except Exception as e:
         print(f"❌ CRUD import failed: {e}")
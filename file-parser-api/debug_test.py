@@ -3,7 +3,7 @@
 Debug script to test file upload and identify issues
 """
 
-import requests
+import httpx
 import json
 
 def test_file_upload():
@@ -11,7 +11,7 @@ def test_file_upload():
     
     # 1. Login to get token
     print("🔐 Logging in...")
-    login_response = requests.post(
+    login_response = httpx.post(
         'http://127.0.0.1:8000/auth/login',
         json={'username': 'testuser', 'password': 'testpass123'}
     )
@@ -31,7 +31,7 @@ def test_file_upload():
     try:
         with open('test.csv', 'rb') as f:
             files = {'file': ('test.csv', f, 'text/csv')}
-            response = requests.post(
+            response = httpx.post(
                 'http://127.0.0.1:8000/files',
                 files=files,
                 headers=headers
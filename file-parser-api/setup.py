@@ -6,23 +6,56 @@ Automates the installation and setup process
 
 import os
 import sys
+import io
+import hashlib
+import importlib.util
 import subprocess
 import platform
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+PIP_CACHE_DIR = ".pip-cache"
+WHEELHOUSE_DIR = ".wheelhouse"
+COMMAND_OUTPUT_TAIL_LINES = 200
+
+def buffered_log(buffer):
+    """Return a print-like function that collects lines until the stage writes them out"""
+    return lambda message="": buffer.write(f"{message}\n")
+
+def flush_log(buffer):
+    """Write a stage's collected output in one go"""
+    sys.stdout.write(buffer.getvalue())
+    sys.stdout.flush()
 
 def run_command(command, description):
-    """Run a command and handle errors"""
+    """Run a command, streaming its output, and handle errors"""
     print(f"🔄 {description}...")
+    # Output is echoed as it arrives; only the tail is kept for the failure report
+    recent_output = deque(maxlen=COMMAND_OUTPUT_TAIL_LINES)
     try:
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
-        print(f"✅ {description} completed successfully")
-        return True
-    except subprocess.CalledProcessError as e:
+        # An argv list runs the program directly instead of through an extra shell process
+        with subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1
+        ) as process:
+            for line in process.stdout:
+                recent_output.append(line)
+                print(f"   {line}", end="")
+            returncode = process.wait()
+    except OSError as e:
+        # Without a shell, a missing executable surfaces here instead of as a non-zero exit
         print(f"❌ {description} failed: {e}")
-        if e.stdout:
-            print(f"   Output: {e.stdout}")
-        if e.stderr:
-            print(f"   Error: {e.stderr}")
         return False
+    
+    if returncode != 0:
+        print(f"❌ {description} failed with exit code {returncode}")
+        if recent_output:
+            print("   Last output:")
+            for line in recent_output:
+                print(f"   {line}", end="")
+        return False
+    
+    print(f"✅ {description} completed successfully")
+    return True
 
 def check_python_version():
     """Check if Python version is compatible"""
@@ -44,12 +77,30 @@ def create_virtual_environment():
         return True
     
     # Create virtual environment
-    if not run_command("python -m venv .venv", "Creating virtual environment"):
+    if not run_command([sys.executable, "-m", "venv", ".venv"], "Creating virtual environment"):
         return False
     
     print("✅ Virtual environment created successfully")
     return True
 
+def requirements_digest():
+    """Hash requirements.txt so the wheelhouse can be reused until it changes"""
+    with open("requirements.txt", "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def read_wheelhouse_stamp():
+    """Return the requirements hash the wheelhouse was built from, if any"""
+    try:
+        with open(os.path.join(WHEELHOUSE_DIR, ".stamp")) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def write_wheelhouse_stamp(digest):
+    """Record the requirements hash the wheelhouse was built from"""
+    with open(os.path.join(WHEELHOUSE_DIR, ".stamp"), "w") as f:
+        f.write(digest)
+
 def install_dependencies():
     """Install required dependencies"""
     print("📦 Installing dependencies...")
@@ -57,30 +108,61 @@ def install_dependencies():
     # Determine activation command based on OS
     if platform.system() == "Windows":
         activate_cmd = ".venv\\Scripts\\activate"
-        pip_cmd = ".venv\\Scripts\\pip"
+        pip_cmd = [os.path.join(".venv", "Scripts", "python.exe"), "-m", "pip"]
     else:
         activate_cmd = "source .venv/bin/activate"
-        pip_cmd = ".venv/bin/pip"
+        pip_cmd = [os.path.join(".venv", "bin", "python"), "-m", "pip"]
+    
+    # Only refresh the wheelhouse (the one networked step) when requirements.txt changes
+    digest = requirements_digest()
+    if read_wheelhouse_stamp() != digest:
+        # Current pip and wheel let sdist-only packages be built once and reused from the cache
+        if not run_command(
+            [*pip_cmd, "install", "--upgrade", "--cache-dir", PIP_CACHE_DIR, "pip", "wheel"],
+            "Upgrading pip and wheel"
+        ):
+            return False
+        
+        if not run_command(
+            [*pip_cmd, "wheel", "--prefer-binary", "--cache-dir", PIP_CACHE_DIR,
+             "-w", WHEELHOUSE_DIR, "-r", "requirements.txt"],
+            "Building wheelhouse"
+        ):
+            return False
+        
+        write_wheelhouse_stamp(digest)
+    else:
+        print("✅ Wheelhouse is up to date")
     
-    # Install dependencies
-    if not run_command(f"{pip_cmd} install -r requirements.txt", "Installing dependencies"):
+    # Install offline from the wheelhouse
+    if not run_command(
+        [*pip_cmd, "install", "--no-index", "--find-links", WHEELHOUSE_DIR, "-r", "requirements.txt"],
+        "Installing dependencies"
+    ):
         return False
     
     print("✅ Dependencies installed successfully")
     return True
 
-def create_directories():
+def prepare_environment():
+    """Create the virtual environment, then install dependencies into it"""
+    if not create_virtual_environment():
+        return "❌ Failed to create virtual environment"
+    
+    if not install_dependencies():
+        return "❌ Failed to install dependencies"
+    
+    return None
+
+def create_directories(log=print):
     """Create necessary directories"""
-    print("📁 Creating directories...")
+    log("📁 Creating directories...")
     
-    directories = ["data", "uploads"]
+    directories = ("data", "uploads")
     for directory in directories:
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-            print(f"✅ Created directory: {directory}")
-        else:
-            print(f"✅ Directory already exists: {directory}")
+        os.makedirs(directory, exist_ok=True)
     
+    log(f"✅ Directories ready: {', '.join(directories)}")
     return True
 
 def test_installation():
@@ -88,14 +170,18 @@ def test_installation():
     print("🧪 Testing installation...")
     
     try:
-        # Test import
-        import app.main
-        print("✅ Application imports successfully")
+        # Locate the application without importing it, which would boot FastAPI
+        if importlib.util.find_spec("app.main") is None:
+            raise ImportError("app.main could not be found")
+        print("✅ Application module found")
         
-        # Test database connection
+        # Test database connection, creating tables only when some are missing
+        from sqlalchemy import inspect
         from app.database import engine
         from app.models import Base
-        Base.metadata.create_all(bind=engine)
+        existing_tables = set(inspect(engine).get_table_names())
+        if not existing_tables.issuperset(Base.metadata.tables):
+            Base.metadata.create_all(bind=engine)
         print("✅ Database connection successful")
         
         return True
@@ -105,35 +191,39 @@ def test_installation():
 
 def print_next_steps():
     """Print next steps for the user"""
-    print("\n" + "="*60)
-    print("🎉 SETUP COMPLETED SUCCESSFULLY!")
-    print("="*60)
-    print("\n📋 Next Steps:")
-    print("1. Activate virtual environment:")
+    output = io.StringIO()
+    log = buffered_log(output)
+    
+    log("\n" + "="*60)
+    log("🎉 SETUP COMPLETED SUCCESSFULLY!")
+    log("="*60)
+    log("\n📋 Next Steps:")
+    log("1. Activate virtual environment:")
     if platform.system() == "Windows":
-        print("   .venv\\Scripts\\activate")
+        log("   .venv\\Scripts\\activate")
     else:
-        print("   source .venv/bin/activate")
+        log("   source .venv/bin/activate")
     
-    print("\n2. Start the server:")
-    print("   uvicorn app.main:app --reload --host 127.0.0.1 --port 8000")
+    log("\n2. Start the server:")
+    log("   uvicorn app.main:app --reload --host 127.0.0.1 --port 8000")
     
-    print("\n3. Access the API:")
-    print("   - API Base URL: http://127.0.0.1:8000")
-    print("   - Interactive Docs: http://127.0.0.1:8000/docs")
-    print("   - Health Check: http://127.0.0.1:8000/")
+    log("\n3. Access the API:")
+    log("   - API Base URL: http://127.0.0.1:8000")
+    log("   - Interactive Docs: http://127.0.0.1:8000/docs")
+    log("   - Health Check: http://127.0.0.1:8000/")
     
-    print("\n4. Test the API:")
-    print("   python test_api.py")
+    log("\n4. Test the API:")
+    log("   python test_api.py")
     
-    print("\n5. Import Postman collection:")
-    print("   File: File_Parser_API.postman_collection.json")
+    log("\n5. Import Postman collection:")
+    log("   File: File_Parser_API.postman_collection.json")
     
-    print("\n📚 Documentation:")
-    print("   - README.md: Complete setup and usage guide")
-    print("   - Interactive API docs: http://127.0.0.1:8000/docs")
+    log("\n📚 Documentation:")
+    log("   - README.md: Complete setup and usage guide")
+    log("   - Interactive API docs: http://127.0.0.1:8000/docs")
     
-    print("\n🚀 Happy coding!")
+    log("\n🚀 Happy coding!")
+    flush_log(output)
 
 def main():
     """Main setup function"""
@@ -144,18 +234,22 @@ def main():
     if not check_python_version():
         sys.exit(1)
     
-    # Create virtual environment
-    if not create_virtual_environment():
-        print("❌ Failed to create virtual environment")
-        sys.exit(1)
+    # Directories do not depend on the virtual environment, so create them while it is set up
+    # The environment stage streams pip output live; the directory stage is buffered and
+    # written once the environment is done, so the two never interleave
+    directories_output = io.StringIO()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        environment = executor.submit(prepare_environment)
+        directories = executor.submit(create_directories, buffered_log(directories_output))
+        environment_error = environment.result()
+        directories_created = directories.result()
+    flush_log(directories_output)
     
-    # Install dependencies
-    if not install_dependencies():
-        print("❌ Failed to install dependencies")
+    if environment_error:
+        print(environment_error)
         sys.exit(1)
     
-    # Create directories
-    if not create_directories():
+    if not directories_created:
         print("❌ Failed to create directories")
         sys.exit(1)
     
@@ -4,18 +4,27 @@ Test script for File Parser CRUD API
 Tests all endpoints to ensure they're working correctly
 """
 
-import requests
-import json
+import asyncio
+import httpx
+import orjson
 import time
 import os
 
 BASE_URL = "http://127.0.0.1:8000"
 
-def test_health_check():
+# Each fixture gets its own upload -> progress -> content -> delete pipeline.
+FIXTURES = ["test.csv", "test_data.csv"]
+PROCESSING_TIMEOUT = 30
+# The content endpoint holds the request open this long while the file is processing.
+LONG_POLL_SECONDS = 25
+# Every check shares one keep-alive pool instead of opening a connection per request.
+CONNECTION_LIMITS = httpx.Limits(max_connections=16, max_keepalive_connections=4)
+
+async def test_health_check(client):
     """Test the root endpoint"""
     print("🔍 Testing Health Check...")
     try:
-        response = requests.get(f"{BASE_URL}/")
+        response = await client.get("/")
         if response.status_code == 200:
             data = response.json()
             print(f"✅ Health Check: {data['message']}")
@@ -27,15 +36,14 @@ def test_health_check():
         print(f"❌ Health Check error: {e}")
         return False
 
-def test_file_upload():
+async def test_file_upload(client, path="test.csv"):
     """Test file upload endpoint"""
-    print("\n📤 Testing File Upload...")
+    print(f"\n📤 Testing File Upload ({path})...")
     try:
-        # Test with the existing test.csv file
-        with open("test.csv", "rb") as f:
-            files = {"file": ("test.csv", f, "text/csv")}
-            response = requests.post(f"{BASE_URL}/files", files=files)
-        
+        with open(path, "rb") as f:
+            files = {"file": (os.path.basename(path), f, "text/csv")}
+            response = await client.post("/files", files=files)
+
         if response.status_code == 200:
             data = response.json()
             print(f"✅ File Upload: {data['message']}")
@@ -50,15 +58,15 @@ def test_file_upload():
         print(f"❌ File Upload error: {e}")
         return None
 
-def test_progress_tracking(file_id):
+async def test_progress_tracking(client, file_id):
     """Test progress tracking endpoint"""
     print(f"\n📊 Testing Progress Tracking for file {file_id}...")
-    
+
     # Wait a bit for processing to start
-    time.sleep(2)
-    
+    await asyncio.sleep(2)
+
     try:
-        response = requests.get(f"{BASE_URL}/files/{file_id}/progress")
+        response = await client.get(f"/files/{file_id}/progress")
         if response.status_code == 200:
             data = response.json()
             print(f"✅ Progress Check: Status={data['status']}, Progress={data['progress']}%")
@@ -70,46 +78,62 @@ def test_progress_tracking(file_id):
         print(f"❌ Progress Check error: {e}")
         return None
 
-def test_file_content(file_id):
+async def wait_for_processing(client, file_id):
+    """Long-poll the small progress endpoint, backing off between retries, until processing finishes"""
+    delay = 0.1
+    while True:
+        response = await client.get(f"/files/{file_id}/progress", params={"wait_ready": LONG_POLL_SECONDS})
+        if response.status_code != 200:
+            print(f"❌ File Content failed: {response.status_code}")
+            return None
+
+        data = response.json()
+        if data['status'] in ('ready', 'failed'):
+            return data
+
+        print(f"⏳ File Content: Still processing ({data['status']})...")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 2.0)
+
+async def wait_for_content(client, file_id):
+    """Wait for processing, then fetch the full content exactly once"""
+    progress = await wait_for_processing(client, file_id)
+    if progress is None:
+        return False
+    if progress['status'] == 'failed':
+        print(f"❌ File Content: Processing failed - {progress.get('error_message') or 'Unknown error'}")
+        return False
+
+    response = await client.get(f"/files/{file_id}")
+    if response.status_code != 200:
+        print(f"❌ File Content failed: {response.status_code}")
+        return False
+
+    # The ready payload carries every parsed row, so decode it with orjson
+    data = orjson.loads(response.content)
+    content = data['content'] or {}
+    print(f"✅ File Content: File processed successfully")
+    print(f"   Rows: {content.get('row_count', content.get('item_count', 0))}")
+    return True
+
+async def test_file_content(client, file_id):
     """Test getting file content"""
     print(f"\n📄 Testing File Content for file {file_id}...")
-    
-    # Wait for processing to complete
-    max_wait = 30
-    wait_time = 0
-    
-    while wait_time < max_wait:
-        try:
-            response = requests.get(f"{BASE_URL}/files/{file_id}")
-            if response.status_code == 200:
-                data = response.json()
-                if data['status'] == 'ready':
-                    print(f"✅ File Content: File processed successfully")
-                    print(f"   Rows: {len(data['content']) if data['content'] else 0}")
-                    return True
-                elif data['status'] == 'failed':
-                    print(f"❌ File Content: Processing failed - {data.get('error_message', 'Unknown error')}")
-                    return False
-                else:
-                    print(f"⏳ File Content: Still processing ({data['status']})...")
-                    time.sleep(2)
-                    wait_time += 2
-                continue
-            else:
-                print(f"❌ File Content failed: {response.status_code}")
-                return False
-        except Exception as e:
-            print(f"❌ File Content error: {e}")
-            return False
-    
-    print(f"⏰ Timeout waiting for file processing")
-    return False
 
-def test_list_files():
+    try:
+        return await asyncio.wait_for(wait_for_content(client, file_id), PROCESSING_TIMEOUT)
+    except asyncio.TimeoutError:
+        print(f"⏰ Timeout waiting for file processing")
+        return False
+    except Exception as e:
+        print(f"❌ File Content error: {e}")
+        return False
+
+async def test_list_files(client):
     """Test listing files endpoint"""
     print("\n📋 Testing List Files...")
     try:
-        response = requests.get(f"{BASE_URL}/files")
+        response = await client.get("/files")
         if response.status_code == 200:
             data = response.json()
             print(f"✅ List Files: Found {data['total_count']} files")
@@ -123,11 +147,11 @@ def test_list_files():
         print(f"❌ List Files error: {e}")
         return False
 
-def test_delete_file(file_id):
+async def test_delete_file(client, file_id):
     """Test file deletion endpoint"""
     print(f"\n🗑️ Testing File Deletion for file {file_id}...")
     try:
-        response = requests.delete(f"{BASE_URL}/files/{file_id}")
+        response = await client.delete(f"/files/{file_id}")
         if response.status_code == 200:
             data = response.json()
             print(f"✅ File Deletion: {data['message']}")
@@ -139,49 +163,60 @@ def test_delete_file(file_id):
         print(f"❌ File Deletion error: {e}")
         return False
 
-def main():
-    """Run all tests"""
+async def file_pipeline(client, path):
+    """Upload a fixture and follow it through progress, content and deletion"""
+    results = {"upload": False, "progress": False, "content": False, "delete": False}
+
+    file_id = await test_file_upload(client, path)
+    if not file_id:
+        return results
+    results["upload"] = True
+
+    results["progress"] = await test_progress_tracking(client, file_id) is not None
+    results["content"] = await test_file_content(client, file_id)
+    results["delete"] = await test_delete_file(client, file_id)
+    return results
+
+async def run_tests():
+    """Run all tests, with independent endpoints checked concurrently"""
     print("🚀 Starting File Parser CRUD API Tests")
     print("=" * 50)
-    
-    # Test 1: Health Check
-    if not test_health_check():
-        print("❌ Health check failed. Server may not be running.")
-        return
-    
-    # Test 2: File Upload
-    file_id = test_file_upload()
-    if not file_id:
-        print("❌ File upload failed. Cannot continue with other tests.")
-        return
-    
-    # Test 3: Progress Tracking
-    status = test_progress_tracking(file_id)
-    
-    # Test 4: File Content (wait for processing)
-    content_success = test_file_content(file_id)
-    
-    # Test 5: List Files
-    list_success = test_list_files()
-    
-    # Test 6: File Deletion
-    delete_success = test_delete_file(file_id)
-    
+
+    start_time = time.time()
+    async with httpx.AsyncClient(
+        base_url=BASE_URL, timeout=PROCESSING_TIMEOUT, limits=CONNECTION_LIMITS
+    ) as client:
+        # Test 1: Health Check
+        if not await test_health_check(client):
+            print("❌ Health check failed. Server may not be running.")
+            return
+
+        # Tests 2-6: listing and one pipeline per fixture run side by side
+        list_success, *pipelines = await asyncio.gather(
+            test_list_files(client),
+            *[file_pipeline(client, path) for path in FIXTURES]
+        )
+
     # Summary
     print("\n" + "=" * 50)
     print("📊 TEST SUMMARY")
     print("=" * 50)
     print(f"✅ Health Check: PASSED")
-    print(f"✅ File Upload: PASSED")
-    print(f"✅ Progress Tracking: PASSED")
-    print(f"{'✅' if content_success else '❌'} File Content: {'PASSED' if content_success else 'FAILED'}")
     print(f"{'✅' if list_success else '❌'} List Files: {'PASSED' if list_success else 'FAILED'}")
-    print(f"{'✅' if delete_success else '❌'} File Deletion: {'PASSED' if delete_success else 'FAILED'}")
-    
-    if all([content_success, list_success, delete_success]):
+    for path, results in zip(FIXTURES, pipelines):
+        for name, passed in results.items():
+            label = f"{name.capitalize()} ({path})"
+            print(f"{'✅' if passed else '❌'} {label}: {'PASSED' if passed else 'FAILED'}")
+    print(f"⏱️ Completed in {time.time() - start_time:.1f}s")
+
+    if list_success and all(all(results.values()) for results in pipelines):
         print("\n🎉 ALL TESTS PASSED! The API is working perfectly!")
     else:
         print("\n⚠️ Some tests failed. Check the output above for details.")
 
+def main():
+    """Run all tests"""
+    asyncio.run(run_tests())
+
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
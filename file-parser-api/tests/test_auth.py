@@ -9,16 +9,68 @@ from datetime import datetime, timedelta
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
-from app.auth import AuthManager, get_current_user, get_current_active_user, require_admin
+from app.auth import AuthManager, auth_manager as shared_auth_manager, get_current_user, get_current_active_user, require_admin
 from app.models import User
 from app.schemas import UserCreate, TokenData
 
+# The user fixtures are shared by the whole session and never mutated, so they get a fixed timestamp
+FIXED_CREATED_AT = datetime(2024, 1, 1)
+
+@pytest.fixture(autouse=True)
+def clear_auth_caches():
+    """Reset the shared token/user caches between tests"""
+    shared_auth_manager.clear_caches()
+    yield
+    shared_auth_manager.clear_caches()
+
+@pytest.fixture(scope="session", autouse=True)
+def fast_bcrypt():
+    """Hash at bcrypt's minimum cost; the tests check logic, not work factor"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("app.auth.BCRYPT_ROUNDS", 4)
+        mp.setattr(shared_auth_manager, "bcrypt_rounds", 4)
+        yield
+
+@pytest.fixture(scope="session")
+def auth_manager(fast_bcrypt):
+    """One AuthManager shared by the tests that only need real bcrypt output"""
+    return AuthManager()
+
+@pytest.fixture(scope="session")
+def known_hash(auth_manager):
+    """A password and its bcrypt hash, computed once for the whole session"""
+    password = "testpassword123"
+    return password, auth_manager.get_password_hash(password)
+
+@pytest.fixture(scope="session")
+def access_token(auth_manager):
+    """Access token for the sample user, signed once for the session"""
+    return auth_manager.create_access_token({"sub": "testuser"})
+
+@pytest.fixture(scope="session")
+def refresh_token(auth_manager):
+    """Refresh token for the sample user, signed once for the session"""
+    return auth_manager.create_refresh_token({"sub": "testuser"})
+
 @pytest.fixture
-def mock_db():
-    """Mock database session"""
+def stub_hash(monkeypatch):
+    """Replace bcrypt with a trivial reversible hash where only control flow is under test"""
+    monkeypatch.setattr(AuthManager, "get_password_hash", lambda self, password: "h:" + password)
+    monkeypatch.setattr(AuthManager, "verify_password", lambda self, plain, hashed: hashed == "h:" + plain)
+
+@pytest.fixture(scope="session")
+def db_template():
+    """Spec'd Session mock, built once since the spec walks the whole Session class"""
     return Mock(spec=Session)
 
 @pytest.fixture
+def mock_db(db_template):
+    """Mock database session whose user lookup finds no row unless a test says otherwise"""
+    db_template.reset_mock(return_value=True, side_effect=True)
+    db_template.query.return_value.filter.return_value.first.return_value = None
+    return db_template
+
+@pytest.fixture(scope="session")
 def sample_user():
     """Sample user for testing"""
     return User(
@@ -29,10 +81,10 @@ def sample_user():
         hashed_password="hashed_password",
         is_active=True,
         is_admin=False,
-        created_at=datetime.utcnow()
+        created_at=FIXED_CREATED_AT
     )
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def admin_user():
     """Admin user for testing"""
     return User(
@@ -43,17 +95,26 @@ def admin_user():
         hashed_password="hashed_password",
         is_active=True,
         is_admin=True,
-        created_at=datetime.utcnow()
+        created_at=FIXED_CREATED_AT
     )
 
+@pytest.fixture(scope="session")
+def token_data():
+    """Decoded access token for the sample user"""
+    return TokenData(username="testuser", token_type="access")
+
+@pytest.fixture(scope="session")
+def user_create_factory():
+    """Build UserCreate payloads by copying one validated base instead of re-validating each"""
+    base = UserCreate(username="newuser", email="new@example.com", password="password123")
+    return lambda **changes: base.model_copy(update=changes)
+
 class TestAuthManager:
     """Test cases for AuthManager class"""
     
-    def test_verify_password(self):
+    def test_verify_password(self, auth_manager, known_hash):
         """Test password verification"""
-        auth_manager = AuthManager()
-        plain_password = "testpassword123"
-        hashed_password = auth_manager.get_password_hash(plain_password)
+        plain_password, hashed_password = known_hash
         
         # Should verify correctly
         assert auth_manager.verify_password(plain_password, hashed_password) is True
@@ -61,11 +122,26 @@ class TestAuthManager:
         # Should fail with wrong password
         assert auth_manager.verify_password("wrongpassword", hashed_password) is False
     
-    def test_get_password_hash(self):
-        """Test password hashing"""
+    def test_verify_password_malformed_hash(self):
+        """Test verification against a non-bcrypt hash fails instead of raising"""
+        auth_manager = AuthManager()
+        assert auth_manager.verify_password("testpassword123", "not-a-bcrypt-hash") is False
+    
+    def test_verify_password_cached(self, known_hash):
+        """Test a repeated successful check skips bcrypt while failures are rechecked"""
         auth_manager = AuthManager()
-        password = "testpassword123"
-        hashed = auth_manager.get_password_hash(password)
+        _, hashed_password = known_hash
+        assert auth_manager.verify_password("testpassword123", hashed_password) is True
+        
+        with patch('app.auth.bcrypt.checkpw', return_value=False) as mock_checkpw:
+            assert auth_manager.verify_password("testpassword123", hashed_password) is True
+            mock_checkpw.assert_not_called()
+            assert auth_manager.verify_password("wrongpassword", hashed_password) is False
+            mock_checkpw.assert_called_once()
+    
+    def test_get_password_hash(self, auth_manager, known_hash):
+        """Test password hashing"""
+        password, hashed = known_hash
         
         # Should not be the same as plain text
         assert hashed != password
@@ -75,11 +151,9 @@ class TestAuthManager:
         hashed2 = auth_manager.get_password_hash(password)
         assert hashed != hashed2
     
-    def test_create_access_token(self):
+    def test_create_access_token(self, auth_manager, access_token):
         """Test access token creation"""
-        auth_manager = AuthManager()
-        data = {"sub": "testuser"}
-        token = auth_manager.create_access_token(data)
+        token = access_token
         
         # Should be a string
         assert isinstance(token, str)
@@ -88,11 +162,9 @@ class TestAuthManager:
         assert decoded.username == "testuser"
         assert decoded.token_type == "access"
     
-    def test_create_refresh_token(self):
+    def test_create_refresh_token(self, auth_manager, refresh_token):
         """Test refresh token creation"""
-        auth_manager = AuthManager()
-        data = {"sub": "testuser"}
-        token = auth_manager.create_refresh_token(data)
+        token = refresh_token
         
         # Should be a string
         assert isinstance(token, str)
@@ -101,13 +173,26 @@ class TestAuthManager:
         assert decoded.username == "testuser"
         assert decoded.token_type == "refresh"
     
-    def test_verify_token_valid(self):
+    def test_create_access_token_cached(self):
+        """Test identical claims within the same second reuse the signed token"""
+        auth_manager = AuthManager()
+        with patch('app.auth.datetime') as mock_datetime:
+            mock_datetime.utcnow.return_value = datetime(2030, 1, 1)
+            first = auth_manager.create_access_token({"sub": "testuser"})
+            with patch.object(auth_manager._jwt, 'encode') as mock_encode:
+                second = auth_manager.create_access_token({"sub": "testuser"})
+                other = auth_manager.create_refresh_token({"sub": "testuser"})
+        
+        assert second == first
+        mock_encode.assert_called_once()
+        assert other == mock_encode.return_value
+    
+    def test_verify_token_valid(self, access_token):
         """Test valid token verification"""
+        # A fresh manager has an empty token cache, so this really decodes the token
         auth_manager = AuthManager()
-        data = {"sub": "testuser"}
-        token = auth_manager.create_access_token(data)
         
-        result = auth_manager.verify_token(token)
+        result = auth_manager.verify_token(access_token)
         assert result is not None
         assert result.username == "testuser"
         assert result.token_type == "access"
@@ -120,25 +205,35 @@ class TestAuthManager:
         result = auth_manager.verify_token("invalid_token")
         assert result is None
     
+    def test_verify_token_cached(self):
+        """Test repeated verification of the same token skips jwt.decode"""
+        auth_manager = AuthManager()
+        token = auth_manager.create_access_token({"sub": "testuser"})
+        
+        first = auth_manager.verify_token(token)
+        with patch.object(auth_manager._jwt, 'decode') as mock_decode:
+            second = auth_manager.verify_token(token)
+        
+        mock_decode.assert_not_called()
+        assert second == first
+    
+    def test_verify_token_invalid_not_cached(self):
+        """Test invalid tokens are never cached"""
+        auth_manager = AuthManager()
+        
+        assert auth_manager.verify_token("invalid_token") is None
+        assert len(auth_manager._token_cache) == 0
+    
     def test_verify_token_expired(self):
         """Test expired token verification"""
         auth_manager = AuthManager()
         data = {"sub": "testuser"}
         
-        # Create token with very short expiry
-        with patch('app.auth.ACCESS_TOKEN_EXPIRE_MINUTES', 0):
-            token = auth_manager.create_access_token(data)
-        
-        # Wait a bit for token to expire
-        import time
-        time.sleep(0.1)
+        # Issue the token an hour in the past so it is already expired
+        token = auth_manager.create_access_token(data, now=datetime.utcnow() - timedelta(hours=1))
         
-        # Should raise HTTPException for expired token
-        with pytest.raises(HTTPException) as exc_info:
-            auth_manager.verify_token(token)
-        
-        assert exc_info.value.status_code == 401
-        assert "expired" in str(exc_info.value.detail)
+        # Expired tokens are rejected like any other invalid token
+        assert auth_manager.verify_token(token) is None
     
     def test_authenticate_user_valid(self, mock_db, sample_user):
         """Test valid user authentication"""
@@ -148,8 +243,8 @@ class TestAuthManager:
         mock_db.query.return_value.filter.return_value.first.return_value = sample_user
         
         # Mock password verification
-        with patch.object(auth_manager, 'verify_password', return_value=True):
-            result = auth_manager.authenticate_user(mock_db, "testuser", "password")
+        auth_manager.verify_password = lambda plain_password, hashed_password: True
+        result = auth_manager.authenticate_user(mock_db, "testuser", "password")
         
         assert result == sample_user
     
@@ -157,9 +252,6 @@ class TestAuthManager:
         """Test authentication with invalid username"""
         auth_manager = AuthManager()
         
-        # Mock database query returning None
-        mock_db.query.return_value.filter.return_value.first.return_value = None
-        
         result = auth_manager.authenticate_user(mock_db, "nonexistent", "password")
         assert result is None
     
@@ -171,25 +263,22 @@ class TestAuthManager:
         mock_db.query.return_value.filter.return_value.first.return_value = sample_user
         
         # Mock password verification failing
-        with patch.object(auth_manager, 'verify_password', return_value=False):
-            result = auth_manager.authenticate_user(mock_db, "testuser", "wrongpassword")
+        auth_manager.verify_password = lambda plain_password, hashed_password: False
+        result = auth_manager.authenticate_user(mock_db, "testuser", "wrongpassword")
         
         assert result is None
 
 class TestAuthDependencies:
     """Test cases for authentication dependencies"""
     
-    @patch('app.auth.security')
-    def test_get_current_user_valid(self, mock_security, mock_db, sample_user):
+    def test_get_current_user_valid(self, mock_db, sample_user, token_data):
         """Test getting current user with valid token"""
-        # Mock security dependency
         mock_credentials = Mock()
         mock_credentials.credentials = "valid_token"
-        mock_security.return_value = mock_credentials
         
         # Mock token verification
         with patch('app.auth.auth_manager.verify_token') as mock_verify:
-            mock_verify.return_value = TokenData(username="testuser", token_type="access")
+            mock_verify.return_value = token_data
             
             # Mock database query
             mock_db.query.return_value.filter.return_value.first.return_value = sample_user
@@ -198,13 +287,10 @@ class TestAuthDependencies:
             result = get_current_user(mock_credentials, mock_db)
             assert result == sample_user
     
-    @patch('app.auth.security')
-    def test_get_current_user_invalid_token(self, mock_security, mock_db):
+    def test_get_current_user_invalid_token(self, mock_db):
         """Test getting current user with invalid token"""
-        # Mock security dependency
         mock_credentials = Mock()
         mock_credentials.credentials = "invalid_token"
-        mock_security.return_value = mock_credentials
         
         # Mock token verification failing
         with patch('app.auth.auth_manager.verify_token') as mock_verify:
@@ -216,20 +302,14 @@ class TestAuthDependencies:
             
             assert exc_info.value.status_code == 401
     
-    @patch('app.auth.security')
-    def test_get_current_user_not_found(self, mock_security, mock_db):
+    def test_get_current_user_not_found(self, mock_db, token_data):
         """Test getting current user when user not found in database"""
-        # Mock security dependency
         mock_credentials = Mock()
         mock_credentials.credentials = "valid_token"
-        mock_security.return_value = mock_credentials
         
         # Mock token verification
         with patch('app.auth.auth_manager.verify_token') as mock_verify:
-            mock_verify.return_value = TokenData(username="testuser", token_type="access")
-            
-            # Mock database query returning None
-            mock_db.query.return_value.filter.return_value.first.return_value = None
+            mock_verify.return_value = token_data
             
             # Should raise HTTPException
             with pytest.raises(HTTPException) as exc_info:
@@ -237,6 +317,20 @@ class TestAuthDependencies:
             
             assert exc_info.value.status_code == 401
     
+    def test_get_current_user_cached(self, mock_db, sample_user, token_data):
+        """Test the user row is served from cache on subsequent requests"""
+        mock_credentials = Mock()
+        mock_credentials.credentials = "valid_token"
+        
+        with patch('app.auth.auth_manager.verify_token') as mock_verify:
+            mock_verify.return_value = token_data
+            mock_db.query.return_value.filter.return_value.first.return_value = sample_user
+            
+            assert get_current_user(mock_credentials, mock_db) == sample_user
+            assert get_current_user(mock_credentials, mock_db) == sample_user
+        
+        assert mock_db.query.call_count == 1
+    
     def test_get_current_active_user_active(self, sample_user):
         """Test getting current active user"""
         result = get_current_active_user(sample_user)
@@ -273,18 +367,14 @@ class TestAuthDependencies:
         assert exc_info.value.status_code == 403
         assert "Admin privileges required" in str(exc_info.value.detail)
 
+@pytest.mark.usefixtures("stub_hash")
 class TestUserCreation:
     """Test cases for user creation"""
     
-    def test_create_user_success(self, mock_db):
+    def test_create_user_success(self, mock_db, user_create_factory):
         """Test successful user creation"""
         auth_manager = AuthManager()
-        user_data = UserCreate(
-            username="newuser",
-            email="new@example.com",
-            full_name="New User",
-            password="password123"
-        )
+        user_data = user_create_factory(full_name="New User")
         
         # Mock password hashing
         with patch.object(auth_manager, 'get_password_hash', return_value="hashed_password"):
@@ -302,14 +392,10 @@ class TestUserCreation:
             assert result.hashed_password == "hashed_password"
             assert result.is_active is True
     
-    def test_create_user_duplicate_username(self, mock_db):
+    def test_create_user_duplicate_username(self, mock_db, user_create_factory):
         """Test user creation with duplicate username"""
         auth_manager = AuthManager()
-        user_data = UserCreate(
-            username="existinguser",
-            email="new@example.com",
-            password="password123"
-        )
+        user_data = user_create_factory(username="existinguser")
         
         # Mock existing user found
         existing_user = User(username="existinguser")
@@ -322,14 +408,10 @@ class TestUserCreation:
         assert exc_info.value.status_code == 400
         assert "Username already registered" in str(exc_info.value.detail)
     
-    def test_create_user_duplicate_email(self, mock_db):
+    def test_create_user_duplicate_email(self, mock_db, user_create_factory):
         """Test user creation with duplicate email"""
         auth_manager = AuthManager()
-        user_data = UserCreate(
-            username="newuser",
-            email="existing@example.com",
-            password="password123"
-        )
+        user_data = user_create_factory(email="existing@example.com")
         
         # Mock no existing username but existing email
         mock_db.query.return_value.filter.return_value.first.side_effect = [None, User(email="existing@example.com")]
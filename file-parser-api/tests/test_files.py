@@ -0,0 +1,143 @@
+"""
+Tests for the file upload endpoint and its processing bookkeeping
+"""
+
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import auth, utils
+from app.database import Base, get_db, _json_serializer, _json_deserializer
+from app.main import app
+from app.models import File, FilePayload, User
+
+@pytest.fixture
+def db_session():
+    """In-memory database shared by the test and the request handlers"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    yield session
+    session.close()
+    engine.dispose()
+
+@pytest.fixture
+def uploader(db_session):
+    user = User(username="uploader", email="uploader@example.com", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+@pytest.fixture
+def client(db_session, uploader, tmp_path, monkeypatch):
+    """TestClient with the database and current user overridden; uploads land in tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[auth.get_current_active_user] = lambda: uploader
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+@pytest.fixture
+def processed(monkeypatch):
+    """Replace the background processing (fixed progress delays plus the parse pool) with a stub"""
+    file_ids = []
+
+    async def finish_processing(db, file_id, file_path, file_type):
+        # The long-poll wait is what needs the loop-bound Event; exercise it from the loop.
+        await utils.wait_for_processing(file_id, 0)
+        file_ids.append(file_id)
+        utils._processing_done.pop(file_id, None)
+
+    monkeypatch.setattr(utils, "simulate_file_processing", finish_processing)
+    return file_ids
+
+class TestUploadFile:
+    """Test cases for POST /files"""
+
+    def test_upload_csv(self, client, db_session, uploader, processed, tmp_path):
+        """Test a CSV upload is stored, recorded and handed to background processing"""
+        response = client.post("/files", files={"file": ("sales.csv", b"a,b\n1,2\n", "text/csv")})
+
+        assert response.status_code == 200
+        file_id = response.json()["file_id"]
+        assert processed == [file_id]
+
+        db_file = db_session.get(File, file_id)
+        assert db_file.owner_id == uploader.id
+        assert db_file.file_type == "csv"
+        assert db_file.file_size == 8
+        assert (tmp_path / "uploads" / f"{file_id}_sales.csv").read_bytes() == b"a,b\n1,2\n"
+
+class TestFileContent:
+    """Test cases for GET /files/{file_id}"""
+
+    def test_content_beyond_orjson_range(self, client, db_session, uploader):
+        """Test stored content orjson cannot encode (big int plus NaN) is still returned"""
+        db_session.add(File(
+            id="big", filename="big_data.json", original_filename="data.json",
+            file_type="json", status="ready", owner_id=uploader.id
+        ))
+        db_session.add(FilePayload(file_id="big", content={"id": 2 ** 100, "ratio": float("nan")}))
+        db_session.commit()
+
+        response = client.get("/files/big")
+
+        assert response.status_code == 200
+        assert response.json()["content"] == {"id": 2 ** 100, "ratio": None}
+
+class TestProcessingWait:
+    """Test cases for the processing long-poll bookkeeping"""
+
+    def test_track_processing_off_loop(self):
+        """Test tracking from a worker thread with no event loop, as the sync upload handler does"""
+        worker = threading.Thread(target=utils.track_processing, args=("threaded",))
+        worker.start()
+        worker.join()
+
+        async def finish_then_wait():
+            async def finish():
+                await asyncio.sleep(0.01)
+                utils._processing_done.pop("threaded").set()
+            finisher = asyncio.ensure_future(finish())
+            await utils.wait_for_processing("threaded", 5)
+            await finisher
+
+        asyncio.run(finish_then_wait())
+        assert "threaded" not in utils._processing_done
+
+    def test_wait_for_untracked_file(self):
+        """Test waiting on a file that is not being processed returns immediately"""
+        asyncio.run(utils.wait_for_processing("untracked", 5))
+
+class TestParseJson:
+    """Test cases for JSON parsing of values orjson cannot represent"""
+
+    def test_big_integer_round_trips(self, tmp_path):
+        """Test integers wider than 64 bits survive parsing and storage exactly"""
+        path = tmp_path / "big.json"
+        path.write_text('{"id": 12345678901234567890123, "small": 7}')
+
+        result = utils.parse_json_file(str(path))
+
+        assert result["success"]
+        content = result["data"]["content"]
+        assert content["id"] == 12345678901234567890123
+        assert isinstance(content["id"], int)
+        assert _json_deserializer(_json_serializer(content)) == content
+
+    def test_nan_accepted(self, tmp_path):
+        """Test NaN literals, which orjson rejects, still parse"""
+        path = tmp_path / "nan.json"
+        path.write_text('{"a": NaN}')
+
+        result = utils.parse_json_file(str(path))
+
+        assert result["success"]
+        assert result["data"]["content"]["a"] != result["data"]["content"]["a"]